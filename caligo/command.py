@@ -1,16 +1,23 @@
 import asyncio
-from datetime import datetime
+import time
+from collections import deque
 from typing import (
     TYPE_CHECKING,
     Any,
+    AsyncIterable,
     Callable,
     Coroutine,
+    Deque,
+    Dict,
     Iterable,
+    Literal,
     Optional,
     Sequence,
+    Tuple,
     Union,
 )
 
+from pyrogram.errors import MessageNotModified
 from pyrogram.filters import Filter
 from pyrogram.types import Chat, Message
 
@@ -67,6 +74,134 @@ def filters(_filters: Optional[Filter] = None) -> Decorator:
     return filter_decorator
 
 
+def concurrency(
+    limit: int, per: Literal["chat", "global"] = "global", wait: bool = True
+) -> Decorator:
+    """Limits how many invocations of a command function run at the same time.
+
+    The limit applies either to the whole bot or separately to each chat.
+    Invocations over the limit wait for a free slot, or are rejected if ``wait``
+    is False.
+    """
+
+    def concurrency_decorator(func: CommandFunc) -> CommandFunc:
+        setattr(func, "_cmd_concurrency", ConcurrencyLimiter(limit, per, wait))
+        return func
+
+    return concurrency_decorator
+
+
+class ConcurrencyLimiter:
+    """Counts running invocations of a command and queues the ones over the limit
+
+    Slots are handed over to waiters in arrival order. Queue depth and time spent
+    waiting are kept for the stats module.
+    """
+
+    limit: int
+    per: str
+    wait: bool
+
+    queued: int
+    max_queued: int
+    waited: int
+    wait_time: float
+    max_wait_time: float
+    rejected: int
+
+    def __init__(
+        self, limit: int, per: Literal["chat", "global"] = "global", wait: bool = True
+    ) -> None:
+        if limit < 1:
+            raise ValueError("Concurrency limit must be positive")
+
+        if per not in {"chat", "global"}:
+            raise ValueError(f"Unknown concurrency scope '{per}'")
+
+        self.limit = limit
+        self.per = per
+        self.wait = wait
+
+        self.queued = 0
+        self.max_queued = 0
+        self.waited = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+        self.rejected = 0
+
+        self._running: Dict[Optional[int], int] = {}
+        self._waiters: Dict[Optional[int], Deque["asyncio.Future[None]"]] = {}
+
+    @property
+    def running(self) -> int:
+        return sum(self._running.values())
+
+    def _key(self, chat_id: int) -> Optional[int]:
+        return chat_id if self.per == "chat" else None
+
+    async def acquire(self, chat_id: int) -> bool:
+        """Takes a slot, returns False if none is free and waiting isn't allowed."""
+
+        key = self._key(chat_id)
+        running = self._running.get(key, 0)
+        if running < self.limit and not self._waiters.get(key):
+            self._running[key] = running + 1
+            return True
+
+        if not self.wait:
+            self.rejected += 1
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        waiters = self._waiters.setdefault(key, deque())
+        waiters.append(waiter)
+
+        self.queued += 1
+        self.max_queued = max(self.max_queued, self.queued)
+        start = time.monotonic()
+        try:
+            # Resolved by release() when it hands its slot over
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over right before the cancellation
+                self.release(chat_id)
+            else:
+                try:
+                    waiters.remove(waiter)
+                except ValueError:
+                    pass
+
+            raise
+        finally:
+            self.queued -= 1
+            if not waiters and self._waiters.get(key) is waiters:
+                del self._waiters[key]
+
+        wait_time = time.monotonic() - start
+        self.waited += 1
+        self.wait_time += wait_time
+        self.max_wait_time = max(self.max_wait_time, wait_time)
+        return True
+
+    def release(self, chat_id: int) -> None:
+        key = self._key(chat_id)
+
+        waiters = self._waiters.get(key)
+        while waiters:
+            waiter = waiters.popleft()
+            if not waiter.done():
+                # Hand the slot over, the running count stays the same
+                waiter.set_result(None)
+                return
+
+        running = self._running[key] - 1
+        if running:
+            self._running[key] = running
+        else:
+            del self._running[key]
+
+
 class Command:
     name: str
     desc: Optional[str]
@@ -75,6 +210,7 @@ class Command:
     usage_reply: bool
     aliases: Iterable[str]
     filters: Optional[Filter]
+    concurrency: Optional[ConcurrencyLimiter]
     module: Any
     func: CommandFunc
 
@@ -89,6 +225,7 @@ class Command:
         usage_optional: bool = False,
         usage_reply: bool = False,
         aliases: Iterable[str] = [],
+        concurrency: Optional[ConcurrencyLimiter] = None,
     ) -> None:
         self.name = name
         self.module = mod
@@ -99,11 +236,103 @@ class Command:
         self.usage_optional = usage_optional
         self.usage_reply = usage_reply
         self.aliases = aliases
+        self.concurrency = concurrency
 
     def __repr__(self) -> str:
         return f"<command module '{self.name}' from '{self.module.name}'>"
 
 
+class ProgressReporter:
+    """Debounces the progress edits of a command response
+
+    An update sent less than ``interval`` seconds after the previous edit is held
+    back, and only the newest held back text is sent once the interval is over.
+    Text identical to what was last sent is skipped. :meth:`finish` always sends
+    the final state. Any other response of the context drops the held back
+    update, so it can't overwrite the command result.
+    """
+
+    ctx: "Context"
+    interval: float
+
+    last_text: Optional[str]
+    last_time: float
+
+    def __init__(self, ctx: "Context", interval: float = 5) -> None:
+        self.ctx = ctx
+        self.interval = interval
+
+        self.last_text = None
+        self.last_time = 0.0
+
+        self._pending: Optional[Tuple[str, Dict[str, Any]]] = None
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    async def _send(self, text: str, kwargs: Dict[str, Any]) -> None:
+        try:
+            await self.ctx.respond(text, **kwargs)
+        except MessageNotModified:
+            pass
+
+        self.last_text = text
+        self.last_time = time.monotonic()
+
+    async def _send_later(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+
+        self._task = None
+        if self._pending is None:
+            return
+
+        text, kwargs = self._pending
+        self._pending = None
+        await self._send(text, kwargs)
+
+    async def update(self, text: str, **kwargs: Any) -> None:
+        """Shows the text, now or once the interval since the last edit is over."""
+
+        if text == self.last_text:
+            self._pending = None
+            return
+
+        delay = self.last_time + self.interval - time.monotonic()
+        if delay <= 0 and self._task is None:
+            await self._send(text, kwargs)
+            return
+
+        self._pending = (text, kwargs)
+        if self._task is None:
+            self._task = self.ctx.bot.loop.create_task(self._send_later(delay))
+
+    async def finish(self, text: Optional[str] = None, **kwargs: Any) -> None:
+        """Sends the final state right away, defaults to the held back update."""
+
+        if text is None:
+            if self._pending is None:
+                self.cancel()
+                return
+
+            text, kwargs = self._pending
+
+        self.cancel()
+        if text != self.last_text:
+            await self._send(text, kwargs)
+
+    def cancel(self) -> None:
+        """Drops the held back update."""
+
+        self._pending = None
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def reset(self) -> None:
+        """Drops the held back update and forgets what was last sent."""
+
+        self.cancel()
+        self.last_text = None
+
+
 class Context:
     bot: "Caligo"
     chat: Chat
@@ -114,7 +343,7 @@ class Context:
     cmd_len: int
     invoker: str
 
-    last_update_time: Optional[datetime]
+    progress: ProgressReporter
 
     response: Message
     response_mode: Optional[str]
@@ -133,11 +362,10 @@ class Context:
         self.msg = message
         self.message = message
         self.reply_msg = message.reply_to_message
-        self.segments = message.command
         self.cmd_len = cmd_len
-        self.invoker = self.segments[0]
+        self.invoker = message.command[0]
 
-        self.last_update_time = None
+        self.progress = ProgressReporter(self)
 
         self.response = None  # type: ignore
         self.response_mode = None
@@ -147,6 +375,8 @@ class Context:
     def __getattr__(self, name: str) -> Any:
         if name == "args":
             return self._get_args()
+        if name == "segments":
+            return self._get_segments()
 
         raise AttributeError(
             f"'{type(self).__name__}' object has no attribute '{name}'"
@@ -154,9 +384,14 @@ class Context:
 
     # Argument segments
     def _get_args(self) -> Sequence[str]:
-        self.args = self.segments[1:]
+        self.args = self.input.split()
         return self.args
 
+    # Command name followed by the argument segments
+    def _get_segments(self) -> Sequence[str]:
+        self.segments = [self.invoker, *self.args]
+        return self.segments
+
     async def _delete(
         self, delay: Optional[float] = None, message: Optional[Message] = None
     ) -> None:
@@ -185,6 +420,8 @@ class Context:
         delete_after: Optional[Union[int, float]] = None,
         **kwargs: Any,
     ) -> Message:
+        # Whatever is sent now replaces the progress shown so far
+        self.progress.reset()
 
         self.response = await self.bot.respond(
             msg or self.msg,
@@ -207,7 +444,7 @@ class Context:
 
     async def respond_split(
         self,
-        text: str,
+        text: Union[str, AsyncIterable[str]],
         *,
         max_pages: Optional[int] = None,  # type: ignore
         redact: Optional[bool] = None,
@@ -219,44 +456,25 @@ class Context:
         if max_pages is None:
             max_pages: int = self.bot.config["bot"]["overflow_page_limit"]
 
+        if isinstance(text, str):
+            if redact:
+                # Redact before splitting in case the sensitive content is on a message boundary
+                text = self.bot.redact_message(text)
+
+            pages = util.tg.split_pages(text, max_pages)
+            last_msg: Message = None  # type: ignore
+            for page in pages:
+                last_msg = await self.respond_multi(page, redact=False, **kwargs)
+
+            return last_msg
+
         if redact:
-            # Redact before splitting in case the sensitive content is on a message boundary
-            text = self.bot.redact_message(text)
-
-        pages_sent = 0
-        last_msg: Message = None  # type: ignore
-        while text and pages_sent < max_pages:
-            # Make sure that there's an ellipsis placed at both the beginning and end,
-            # depending on whether there's more content to be shown
-            # The conditions are a bit complex, so just use a primitive LUT for now
-            if len(text) <= 4096:
-                # Low remaining content might require no ellipses
-                if pages_sent == 0:
-                    page = text[: util.tg.MESSAGE_CHAR_LIMIT]
-                    ellipsis_chars = 0
-                else:
-                    page = "..." + text[: util.tg.MESSAGE_CHAR_LIMIT - 3]
-                    ellipsis_chars = 3
-            elif pages_sent == max_pages - 1:
-                # Last page should use the standard truncation path if it's too large
-                if pages_sent == 0:
-                    page = text
-                    ellipsis_chars = 0
-                else:
-                    page = "..." + text
-                    ellipsis_chars = 3
-            else:
-                # Remaining content in other pages might need two ellipses
-                if pages_sent == 0:
-                    page = text[: util.tg.MESSAGE_CHAR_LIMIT - 3] + "..."
-                    ellipsis_chars = 3
-                else:
-                    page = "..." + text[: util.tg.MESSAGE_CHAR_LIMIT - 6] + "..."
-                    ellipsis_chars = 6
-
-            last_msg = await self.respond_multi(page, **kwargs)
-            text = text[util.tg.MESSAGE_CHAR_LIMIT - ellipsis_chars :]
-            pages_sent += 1
+            # Same as above, but secrets can't span lines so redacting whole lines is enough
+            text = self.bot.redact_lines(text)
+
+        last_msg = None  # type: ignore
+        async for page in util.tg.split_pages_stream(text, max_pages):
+            last_msg = await self.respond_multi(page, redact=False, **kwargs)
 
         return last_msg
 
@@ -64,6 +64,8 @@ class Caligo(
         self.log.info("Stopping")
         if self.loaded:
             await self.dispatch_event("stop")
+            await self.outbound.close()
+            await self.file_cache.close()
             if self.client.is_connected:
                 await self.client.stop()
 
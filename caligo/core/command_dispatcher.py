@@ -1,4 +1,5 @@
 import inspect
+import re
 from typing import TYPE_CHECKING, Any, Iterable, MutableMapping, Optional
 
 from pyrogram.client import Client
@@ -13,6 +14,9 @@ from .base import CaligoBase
 if TYPE_CHECKING:
     from .bot import Caligo
 
+# Command name, matched right after the prefix
+COMMAND_PATTERN = re.compile(r"\S+")
+
 
 class CommandDispatcher(CaligoBase):
     commands: MutableMapping[str, command.Command]
@@ -33,6 +37,7 @@ class CommandDispatcher(CaligoBase):
         usage_optional: bool = False,
         usage_reply: bool = False,
         aliases: Iterable[str] = [],
+        concurrency: Optional[command.ConcurrencyLimiter] = None,
     ) -> None:
         if getattr(func, "_listener_filters", None):
             self.log.warning(
@@ -45,7 +50,16 @@ class CommandDispatcher(CaligoBase):
             )
 
         cmd = command.Command(
-            name, mod, func, filters, desc, usage, usage_optional, usage_reply, aliases
+            name,
+            mod,
+            func,
+            filters,
+            desc,
+            usage,
+            usage_optional,
+            usage_reply,
+            aliases,
+            concurrency,
         )
 
         if name in self.commands:
@@ -85,6 +99,7 @@ class CommandDispatcher(CaligoBase):
                     usage_optional=getattr(func, "_cmd_usage_optional", False),
                     usage_reply=getattr(func, "_cmd_usage_reply", False),
                     aliases=getattr(func, "_cmd_aliases", []),
+                    concurrency=getattr(func, "_cmd_concurrency", None),
                 )
                 done = True
             finally:
@@ -109,13 +124,17 @@ class CommandDispatcher(CaligoBase):
             if message.via_bot:
                 return False
 
-            if message.text is not None and message.text.startswith(self.prefix):
-                parts = message.text.split()
-                parts[0] = parts[0][len(self.prefix) :]  # Remove prefix
+            text = message.text
+            if text is not None and text.startswith(self.prefix):
+                # Only look at the command name, arguments are split by the Context
+                # if a command asks for them
+                match = COMMAND_PATTERN.match(text, self._prefix_len)
+                if match is None:
+                    return False
 
                 # Filter if command is not in commands
                 try:
-                    cmd = self.commands[parts[0]]
+                    cmd = self.commands[match.group()]
                 except KeyError:
                     return False
 
@@ -128,7 +147,7 @@ class CommandDispatcher(CaligoBase):
                         if not await util.run_sync(cmd.filters, client, message):
                             return False
 
-                message.command = parts
+                message.command = [match.group()]
                 return True
 
             return False
@@ -142,9 +161,16 @@ class CommandDispatcher(CaligoBase):
             ctx = command.Context(
                 self,
                 message,
-                len(self.prefix) + len(message.command[0]) + 1,
+                self._prefix_len + len(message.command[0]) + 1,
             )
 
+            limiter = cmd.concurrency
+            if limiter is not None and not await limiter.acquire(message.chat.id):
+                await ctx.respond(
+                    f"__Too many `{cmd.name}` commands are running, try again later.__"
+                )
+                return
+
             try:
                 ret = await cmd.func(ctx)
                 if ret is not None:
@@ -161,6 +187,9 @@ class CommandDispatcher(CaligoBase):
                     "**Out**:\n⚠️ Error executing command:\n"
                     f"```{util.error.format_exception(e)}```"
                 )
+            finally:
+                if limiter is not None:
+                    limiter.release(message.chat.id)
 
             await self.dispatch_event("command", cmd, message)
         except Exception as e:  # skipcq: PYL-W0703
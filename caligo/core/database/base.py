@@ -1,4 +1,7 @@
-from typing import TYPE_CHECKING, Any, Generic, Union
+import asyncio
+from concurrent.futures import Executor
+from functools import partial
+from typing import TYPE_CHECKING, Any, Callable, Generic, Optional, TypeVar, Union
 
 from bson.codec_options import CodecOptions
 from pymongo.client_session import ClientSession
@@ -15,6 +18,8 @@ from pymongo.write_concern import WriteConcern
 if TYPE_CHECKING:
     from .command_cursor import _LatentCursor
 
+Result = TypeVar("Result")
+
 
 class AsyncBase(Generic[_DocumentType]):
     """Base Class for AsyncIOMongoDB Instances"""
@@ -63,6 +68,18 @@ class AsyncBase(Generic[_DocumentType]):
     def __repr__(self) -> str:
         return type(self).__name__ + f"({self.dispatch!r})"
 
+    async def _run(
+        self, func: Callable[..., Result], *args: Any, **kwargs: Any
+    ) -> Result:
+        """Runs the given blocking call on the client's executor."""
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, partial(func, *args, **kwargs))
+
+    @property
+    def executor(self) -> Optional[Executor]:
+        return None
+
 
 class AsyncBaseProperty(AsyncBase):
     """Base class property for AsyncIOMongoDB instances"""
@@ -0,0 +1,238 @@
+import copy
+from typing import TYPE_CHECKING, Any, Hashable, List, Mapping, Optional, Tuple, Union
+
+from pymongo.results import (
+    BulkWriteResult,
+    DeleteResult,
+    InsertManyResult,
+    InsertOneResult,
+    UpdateResult,
+)
+
+from caligo import util
+
+from .collection import AsyncCollection
+from .typings import Request
+
+if TYPE_CHECKING:
+    from .db import AsyncDatabase
+
+Projection = Optional[Union[List[str], Mapping[str, Any]]]
+
+
+def _id_key(query: Optional[Mapping[str, Any]]) -> Optional[Hashable]:
+    """Returns the _id of a query that matches exactly one _id, otherwise None."""
+
+    if not isinstance(query, Mapping) or len(query) != 1:
+        return None
+
+    try:
+        key = query["_id"]
+    except KeyError:
+        return None
+
+    if isinstance(key, Mapping) or not isinstance(key, Hashable):
+        return None
+
+    return key
+
+
+def _project(document: Mapping[str, Any], projection: Projection) -> Any:
+    """Applies a plain top-level inclusion or exclusion projection.
+
+    Returns NotImplemented for projections that need the server.
+    """
+
+    if projection is None:
+        return copy.deepcopy(document)
+
+    if not isinstance(projection, Mapping):
+        projection = dict.fromkeys(projection, True)
+
+    # Same as pymongo, an empty projection only returns the _id
+    if not projection:
+        projection = {"_id": True}
+
+    fields = {}
+    for field, value in projection.items():
+        if "." in field or field.startswith("$") or not isinstance(value, (bool, int)):
+            return NotImplemented
+
+        fields[field] = bool(value)
+
+    include_id = fields.pop("_id", True)
+    # A lone {"_id": 1} is an inclusion of nothing else
+    if any(fields.values()) or (not fields and "_id" in projection and include_id):
+        if not all(fields.values()):
+            return NotImplemented
+
+        result = {key: document[key] for key in fields if key in document}
+    else:
+        result = {key: value for key, value in document.items() if key not in fields}
+
+    if include_id and "_id" in document:
+        result["_id"] = document["_id"]
+    else:
+        result.pop("_id", None)
+
+    return copy.deepcopy(result)
+
+
+class AsyncCachedCollection(AsyncCollection):
+    """:obj:`~AsyncCollection` serving :meth:`find_one` by _id from memory
+
+    Documents are cached for ``ttl`` seconds after being read. Writes made
+    through this object drop the documents they may have touched, but writes
+    made elsewhere (another collection object, another process) are only seen
+    once the cached copy expires.
+    """
+
+    cache: util.cache.LRUCache[Hashable, Tuple[Optional[Mapping[str, Any]]]]
+
+    def __init__(
+        self,
+        database: "AsyncDatabase",
+        name: str,
+        *,
+        ttl: Optional[float] = 300,
+        maxsize: int = 128,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(database, name, **kwargs)
+
+        # Documents are wrapped in a tuple so that missing documents are cached too
+        self.cache = util.cache.LRUCache(maxsize, ttl=ttl)
+        self._generation = 0
+
+    def invalidate(self, query: Optional[Mapping[str, Any]] = None) -> None:
+        """Drops the cached documents that the given query may match."""
+
+        self._generation += 1
+
+        key = _id_key(query)
+        if key is None:
+            self.cache.clear()
+        else:
+            self.cache.pop(key)
+
+    async def find_one(
+        self, query: Optional[Mapping[str, Any]], *args: Any, **kwargs: Any
+    ) -> Optional[Mapping[str, Any]]:
+        projection = kwargs.pop("projection", args[0] if args else None)
+        key = _id_key(query)
+        if key is None or len(args) > 1 or kwargs:
+            if args:
+                args = args[1:]
+            return await super().find_one(query, projection, *args, **kwargs)
+
+        entry = self.cache.get(key)
+        if entry is None:
+            generation = self._generation
+            document = await super().find_one(query)
+            # Don't store what we read if a write happened meanwhile
+            if generation == self._generation:
+                self.cache.put(key, (document,))
+
+            entry = (document,)
+
+        document = entry[0]
+        if document is None:
+            return None
+
+        result = _project(document, projection)
+        if result is NotImplemented:
+            return await super().find_one(query, projection)
+
+        return result
+
+    async def bulk_write(
+        self, request: List[Request], **kwargs: Any
+    ) -> BulkWriteResult:
+        try:
+            return await super().bulk_write(request, **kwargs)
+        finally:
+            self.invalidate()
+
+    async def delete_many(
+        self, query: Mapping[str, Any], **kwargs: Any
+    ) -> DeleteResult:
+        try:
+            return await super().delete_many(query, **kwargs)
+        finally:
+            self.invalidate(query)
+
+    async def delete_one(self, query: Mapping[str, Any], **kwargs: Any) -> DeleteResult:
+        try:
+            return await super().delete_one(query, **kwargs)
+        finally:
+            self.invalidate(query)
+
+    async def drop(self, *args: Any, **kwargs: Any) -> None:
+        try:
+            await super().drop(*args, **kwargs)
+        finally:
+            self.invalidate()
+
+    async def find_one_and_delete(
+        self, query: Mapping[str, Any], **kwargs: Any
+    ) -> Mapping[str, Any]:
+        try:
+            return await super().find_one_and_delete(query, **kwargs)
+        finally:
+            self.invalidate(query)
+
+    async def find_one_and_replace(
+        self, query: Mapping[str, Any], replacement: Mapping[str, Any], **kwargs: Any
+    ) -> Mapping[str, Any]:
+        try:
+            return await super().find_one_and_replace(query, replacement, **kwargs)
+        finally:
+            self.invalidate(query)
+
+    async def find_one_and_update(
+        self, query: Mapping[str, Any], update: Mapping[str, Any], **kwargs: Any
+    ) -> Mapping[str, Any]:
+        try:
+            return await super().find_one_and_update(query, update, **kwargs)
+        finally:
+            self.invalidate(query)
+
+    async def insert_many(
+        self, documents: List[Mapping[str, Any]], **kwargs: Any
+    ) -> InsertManyResult:
+        try:
+            return await super().insert_many(documents, **kwargs)
+        finally:
+            self.invalidate()
+
+    async def insert_one(
+        self, document: Mapping[str, Any], **kwargs: Any
+    ) -> InsertOneResult:
+        try:
+            return await super().insert_one(document, **kwargs)
+        finally:
+            self.invalidate({"_id": document["_id"]} if "_id" in document else None)
+
+    async def replace_one(
+        self, query: Mapping[str, Any], replacement: Mapping[str, Any], **kwargs: Any
+    ) -> UpdateResult:
+        try:
+            return await super().replace_one(query, replacement, **kwargs)
+        finally:
+            self.invalidate(query)
+
+    async def update_many(
+        self, query: Mapping[str, Any], update: Mapping[str, Any], **kwargs: Any
+    ) -> UpdateResult:
+        try:
+            return await super().update_many(query, update, **kwargs)
+        finally:
+            self.invalidate(query)
+
+    async def update_one(
+        self, query: Mapping[str, Any], update: Mapping[str, Any], **kwargs: Any
+    ) -> UpdateResult:
+        try:
+            return await super().update_one(query, update, **kwargs)
+        finally:
+            self.invalidate(query)
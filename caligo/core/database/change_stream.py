@@ -4,8 +4,6 @@ from bson.timestamp import Timestamp
 from pymongo.change_stream import ChangeStream
 from pymongo.collation import Collation
 
-from caligo import util
-
 from .base import AsyncBase
 from .client_session import AsyncClientSession
 
@@ -13,6 +11,7 @@ if TYPE_CHECKING:
     from .client import AsyncClient
     from .collection import AsyncCollection
     from .db import AsyncDatabase
+    from .executor import AsyncExecutor
 
 
 class AsyncChangeStream(AsyncBase):
@@ -83,7 +82,7 @@ class AsyncChangeStream(AsyncBase):
 
     async def _init(self) -> ChangeStream:
         if not self.dispatch:
-            self.dispatch = await util.run_sync(
+            self.dispatch = await self._run(
                 self._target.dispatch.watch, **self._options
             )
 
@@ -91,7 +90,7 @@ class AsyncChangeStream(AsyncBase):
 
     async def close(self):
         if self.dispatch:
-            await util.run_sync(self.dispatch.close)
+            await self._run(self.dispatch.close)
 
     async def next(self) -> Mapping[str, Any]:
         while self.alive:
@@ -103,7 +102,7 @@ class AsyncChangeStream(AsyncBase):
 
     async def try_next(self) -> Optional[Mapping[str, Any]]:
         self.dispatch = await self._init()
-        return await util.run_sync(self.dispatch.try_next)
+        return await self._run(self.dispatch.try_next)
 
     @property
     def alive(self) -> bool:
@@ -112,6 +111,10 @@ class AsyncChangeStream(AsyncBase):
 
         return self.dispatch.alive
 
+    @property
+    def executor(self) -> "AsyncExecutor":
+        return self._target.executor
+
     @property
     def resume_token(self) -> Any:
         if self.dispatch:
@@ -25,13 +25,13 @@ from pymongo.topology_description import TopologyDescription
 from pymongo.typings import _Address
 from pymongo.write_concern import DEFAULT_WRITE_CONCERN, WriteConcern
 
-from caligo import util
-
 from .base import AsyncBaseProperty
 from .change_stream import AsyncChangeStream
 from .client_session import AsyncClientSession
 from .command_cursor import AsyncCommandCursor, CommandCursor
 from .db import AsyncDatabase
+from .executor import AsyncExecutor
+from .monitoring import CommandMonitor
 from .typings import ReadPreferences
 
 
@@ -43,7 +43,13 @@ class AsyncClient(AsyncBaseProperty):
 
     dispatch: MongoClient
 
-    def __init__(self, *args: Any, **kwargs: Any) -> None:
+    monitor: CommandMonitor
+
+    _executor: AsyncExecutor
+
+    def __init__(
+        self, *args: Any, executor_workers: Optional[int] = None, **kwargs: Any
+    ) -> None:
         kwargs.update(
             {
                 "driver": DriverInfo(
@@ -51,8 +57,18 @@ class AsyncClient(AsyncBaseProperty):
                 )
             }
         )
+        self.monitor = CommandMonitor()
+        listeners = list(kwargs.get("event_listeners") or [])
+        listeners.append(self.monitor)
+        kwargs["event_listeners"] = listeners
         dispatch = MongoClient(*args, **kwargs)
 
+        # Blocking calls get their own threads, one per pooled connection by default,
+        # so they don't queue up behind other work on the loop's default executor
+        if executor_workers is None:
+            executor_workers = dispatch.options.pool_options.max_pool_size or 100
+        self._executor = AsyncExecutor(executor_workers)
+
         # Propagate initialization to base
         super().__init__(dispatch)
 
@@ -63,7 +79,8 @@ class AsyncClient(AsyncBaseProperty):
         return hash(self.address)
 
     async def close(self) -> None:
-        await util.run_sync(self.dispatch.close)
+        await self._run(self.dispatch.close)
+        self._executor.shutdown(wait=False)
 
     async def drop_database(
         self,
@@ -73,7 +90,7 @@ class AsyncClient(AsyncBaseProperty):
         if isinstance(name_or_database, AsyncDatabase):
             name_or_database = name_or_database.name
 
-        return await util.run_sync(
+        return await self._run(
             self.dispatch.drop_database,
             name_or_database,
             session=session.dispatch if session else session,
@@ -122,7 +139,7 @@ class AsyncClient(AsyncBaseProperty):
     async def list_database_names(
         self, session: Optional[AsyncClientSession] = None
     ) -> List[str]:
-        return await util.run_sync(
+        return await self._run(
             self.dispatch.list_database_names,
             session=session.dispatch if session else session,
         )
@@ -138,7 +155,7 @@ class AsyncClient(AsyncBaseProperty):
             read_preference=ReadPreference.PRIMARY,
             write_concern=DEFAULT_WRITE_CONCERN,
         )
-        res: Mapping[str, Any] = await util.run_sync(
+        res: Mapping[str, Any] = await self._run(
             database.dispatch._retryable_read_command,  # skipcq: PYL-W0212
             cmd,
             session=session.dispatch if session else session,
@@ -153,7 +170,7 @@ class AsyncClient(AsyncBaseProperty):
     async def server_info(
         self, session: Optional[AsyncClientSession] = None
     ) -> Mapping[str, Any]:
-        return await util.run_sync(
+        return await self._run(
             self.dispatch.server_info, session=session.dispatch if session else session
         )
 
@@ -167,7 +184,7 @@ class AsyncClient(AsyncBaseProperty):
         default_transaction_options: Optional[TransactionOptions] = None,
         snapshot: bool = False,
     ) -> AsyncGenerator[AsyncClientSession, None]:
-        session = await util.run_sync(
+        session = await self._run(
             self.dispatch.start_session,
             causal_consistency=causal_consistency,
             default_transaction_options=default_transaction_options,
@@ -229,6 +246,10 @@ class AsyncClient(AsyncBaseProperty):
     def event_listeners(self) -> Any:
         return self.dispatch.event_listeners
 
+    @property
+    def executor(self) -> AsyncExecutor:
+        return self._executor
+
     @property
     def is_mongos(self) -> bool:
         return self.dispatch.is_mongos
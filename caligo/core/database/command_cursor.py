@@ -19,8 +19,6 @@ from pymongo.client_session import ClientSession
 from pymongo.command_cursor import CommandCursor as _CommandCursor
 from pymongo.typings import _Address, _DocumentType
 
-from caligo import util
-
 from .client_session import AsyncClientSession
 from .cursor_base import AsyncCursorBase
 
@@ -59,7 +57,8 @@ class CommandCursor(_CommandCursor, Generic[_DocumentType]):
         )
 
     async def _AsyncCommandCursor__die(self, synchronous: bool = False) -> None:
-        await util.run_sync(self.__die, synchronous=synchronous)
+        # skipcq: PYL-W0212
+        await self.delegate._run(self.__die, synchronous=synchronous)
 
     @property
     def _AsyncCommandCursor__data(self) -> Deque[Any]:
@@ -172,7 +171,7 @@ class AsyncLatentCommandCursor(AsyncCommandCursor):
             self.started = True
             original_future = self.loop.create_future()
             future = self.loop.create_task(
-                util.run_sync(self.start, *self.args, **self.kwargs)
+                self._run(self.start, *self.args, **self.kwargs)
             )
             future.add_done_callback(
                 partial(
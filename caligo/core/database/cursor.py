@@ -15,8 +15,6 @@ from bson.code import Code
 from pymongo.cursor import Cursor as _Cursor
 from pymongo.typings import _CollationIn, _DocumentType
 
-from caligo import util
-
 from .cursor_base import AsyncCursorBase
 
 if TYPE_CHECKING:
@@ -59,7 +57,8 @@ class Cursor(_Cursor, Generic[_DocumentType]):
         return self.__data
 
     async def _AsyncCursor__die(self, synchronous: bool = False) -> None:
-        await util.run_sync(self.__die, synchronous=synchronous)
+        # skipcq: PYL-W0212
+        await self.delegate._run(self.__die, synchronous=synchronous)
 
     @property
     def _AsyncCursor__exhaust(self) -> bool:
@@ -127,10 +126,10 @@ class AsyncCursor(AsyncCursorBase, Generic[_DocumentType]):
         return self
 
     async def distinct(self, key: str) -> List[Any]:
-        return await util.run_sync(self.dispatch.distinct, key)
+        return await self._run(self.dispatch.distinct, key)
 
     async def explain(self) -> _DocumentType:
-        return await util.run_sync(self.dispatch.explain)
+        return await self._run(self.dispatch.explain)
 
     def hint(
         self, index: Union[str, List[Tuple[str, Any]]]
@@ -1,9 +1,11 @@
 import asyncio
 import inspect
+from collections import deque
 from functools import partial
 from typing import (
     TYPE_CHECKING,
     Any,
+    AsyncIterator,
     Coroutine,
     Deque,
     Generic,
@@ -19,14 +21,14 @@ from pymongo.collection import Collection
 from pymongo.cursor import _QUERY_OPTIONS, Cursor, RawBatchCursor
 from pymongo.typings import _Address, _DocumentType
 
-from caligo import util
-
+from . import raw
 from .base import AsyncBase
 from .errors import InvalidOperation
 
 if TYPE_CHECKING:
     from .collection import AsyncCollection
     from .command_cursor import CommandCursor, _LatentCursor
+    from .executor import AsyncExecutor
 
 
 class AsyncCursorBase(AsyncBase, Generic[_DocumentType]):
@@ -70,6 +72,14 @@ class AsyncCursorBase(AsyncBase, Generic[_DocumentType]):
 
         self.loop = asyncio.get_event_loop()
 
+        # Read-ahead state, see prefetch()
+        self._prefetch = 0
+        self._prefetch_queue: Optional[asyncio.Queue[Any]] = None
+        self._prefetch_task: Optional[asyncio.Task[None]] = None
+        self._prefetch_fetch: Optional[asyncio.Future[int]] = None
+        self._prefetch_done = False
+        self._ready: Deque[Any] = deque()
+
     async def __aenter__(self) -> "AsyncCursorBase":
         return self
 
@@ -148,8 +158,64 @@ class AsyncCursorBase(AsyncBase, Generic[_DocumentType]):
             if not future.done():
                 future.set_exception(exc)
 
+    def _start_prefetch(self) -> "asyncio.Queue[Any]":
+        if self._prefetch_queue is None:
+            self._prefetch_queue = asyncio.Queue(self._prefetch)
+            self._prefetch_task = self.loop.create_task(
+                self._prefetcher(self._prefetch_queue)
+            )
+
+        return self._prefetch_queue
+
+    async def _prefetcher(self, queue: "asyncio.Queue[Any]") -> None:
+        try:
+            while self.alive:
+                if not self._buffer_size():
+                    # Shielded so that close() can wait for a getMore in flight
+                    self._prefetch_fetch = asyncio.ensure_future(self._get_more())
+                    if not await asyncio.shield(self._prefetch_fetch):
+                        break
+
+                data = self._data()
+                batch = list(data)
+                data.clear()
+
+                await queue.put(batch)
+        except Exception as exc:  # skipcq: PYL-W0703
+            await queue.put(exc)
+            return
+
+        # Mark the end of the cursor
+        await queue.put(None)
+
+    async def _next_batch(self) -> Optional[List[Any]]:
+        if self._prefetch_done:
+            return None
+
+        batch = await self._start_prefetch().get()
+        if isinstance(batch, Exception):
+            self._prefetch_done = True
+            raise batch
+
+        if batch is None:
+            self._prefetch_done = True
+
+        return batch
+
+    async def _to_list_prefetched(
+        self, length: Optional[int]
+    ) -> List[Mapping[str, Any]]:
+        the_list: List[Mapping[str, Any]] = []
+        while length is None or len(the_list) < length:
+            try:
+                the_list.append(await self.next())
+            except StopAsyncIteration:
+                break
+
+        return the_list
+
     async def _refresh(self) -> int:
-        return await util.run_sync(self.dispatch._refresh)  # skipcq: PYL-W0212
+        return await self._run(self.dispatch._refresh)  # skipcq: PYL-W0212
 
     def batch_size(self, batch_size: int) -> "AsyncCursorBase":
         self.dispatch.batch_size(batch_size)
@@ -158,13 +224,87 @@ class AsyncCursorBase(AsyncBase, Generic[_DocumentType]):
     async def close(self) -> None:
         if not self.closed:
             self.closed = True
-            await util.run_sync(self.dispatch.close)
+
+            if self._prefetch_task is not None:
+                self._prefetch_task.cancel()
+                if self._prefetch_fetch is not None and not self._prefetch_fetch.done():
+                    await asyncio.wait({self._prefetch_fetch})
+
+            await self._run(self.dispatch.close)
 
     async def next(self) -> Any:
+        if self._prefetch:
+            while not self._ready:
+                batch = await self._next_batch()
+                if batch is None:
+                    raise StopAsyncIteration
+
+                self._ready.extend(batch)
+
+            return self._ready.popleft()
+
+        # Documents already fetched are served directly, only getMore needs a thread
         if self.alive and (self._buffer_size() or await self._get_more()):
-            return await util.run_sync(next, self.dispatch)
+            return self._data().popleft()
         raise StopAsyncIteration
 
+    async def iter_batches(self) -> AsyncIterator[List[Any]]:
+        """Iterates over the cursor one fetched batch at a time.
+
+        Every batch holds all documents the cursor has buffered, so each
+        round-trip to the server yields exactly one list.
+        """
+        if self._prefetch:
+            if self._ready:
+                yield list(self._ready)
+                self._ready.clear()
+
+            while True:
+                batch = await self._next_batch()
+                if batch is None:
+                    return
+
+                yield batch
+
+        while self.alive:
+            if not self._buffer_size() and not await self._get_more():
+                break
+
+            data = self._data()
+            batch = list(data)
+            data.clear()
+
+            yield batch
+
+    async def iter_raw_documents(self) -> AsyncIterator[memoryview]:
+        """Iterates over the documents of a raw batch cursor without decoding them.
+
+        Only meant for cursors from :meth:`~AsyncCollection.find_raw_batches` and
+        :meth:`~AsyncCollection.aggregate_raw_batches`. Each document is a view into
+        the raw batch bytes, so it can be written out as-is or picked apart with
+        :func:`raw.get_field`/:func:`raw.project`.
+        """
+        async for batch in self.iter_batches():
+            for data in batch:
+                for document in raw.iter_documents(data):
+                    yield document
+
+    def prefetch(self, batches: int) -> "AsyncCursorBase":
+        """Keeps fetching up to the given number of batches ahead in the background.
+
+        The getMore for the next batch then runs while the caller is still
+        processing the current one. Pass 0 to disable read-ahead again, which is
+        only possible before iteration starts.
+        """
+        if batches < 0:
+            raise ValueError("batches must be non-negative")
+
+        if self._prefetch_queue is not None:
+            raise InvalidOperation("Can't change prefetch after iteration started")
+
+        self._prefetch = batches
+        return self
+
     def to_list(
         self, length: Optional[int] = None
     ) -> asyncio.Future[List[Mapping[str, Any]]]:
@@ -174,6 +314,9 @@ class AsyncCursorBase(AsyncBase, Generic[_DocumentType]):
         if self._query_flags() & _QUERY_OPTIONS["tailable_cursor"]:
             raise InvalidOperation("Can't call to_list on tailable cursor")
 
+        if self._prefetch:
+            return self.loop.create_task(self._to_list_prefetched(length))
+
         future = self.loop.create_future()
         the_list: List[Mapping[str, Any]] = []
 
@@ -204,6 +347,10 @@ class AsyncCursorBase(AsyncBase, Generic[_DocumentType]):
             return True
         return self.dispatch.alive
 
+    @property
+    def executor(self) -> "AsyncExecutor":
+        return self.collection.executor  # type: ignore
+
     @property
     def cursor_id(self) -> Optional[int]:
         return self.dispatch.cursor_id
@@ -1,4 +1,4 @@
-from typing import TYPE_CHECKING, Any, List, Literal, Mapping, Optional, Union
+from typing import TYPE_CHECKING, Any, Dict, List, Literal, Mapping, Optional, Union
 
 from bson.codec_options import CodecOptions
 from bson.dbref import DBRef
@@ -9,9 +9,8 @@ from pymongo.database import Database
 from pymongo.read_concern import ReadConcern
 from pymongo.write_concern import WriteConcern
 
-from caligo import util
-
 from .base import AsyncBaseProperty
+from .cached_collection import AsyncCachedCollection
 from .change_stream import AsyncChangeStream
 from .client_session import AsyncClientSession
 from .collection import AsyncCollection
@@ -20,6 +19,7 @@ from .typings import ReadPreferences
 
 if TYPE_CHECKING:
     from .client import AsyncClient
+    from .executor import AsyncExecutor
 
 
 class AsyncDatabase(AsyncBaseProperty):
@@ -34,6 +34,7 @@ class AsyncDatabase(AsyncBaseProperty):
 
     def __init__(self, client: "AsyncClient", database: Database) -> None:
         self._client = client
+        self._cached_collections: Dict[str, AsyncCachedCollection] = {}
 
         # Propagate initialization to base
         super().__init__(database)
@@ -75,7 +76,7 @@ class AsyncDatabase(AsyncBaseProperty):
         session: Optional[AsyncClientSession] = None,
         **kwargs: Any,
     ) -> Mapping[str, Any]:
-        return await util.run_sync(
+        return await self._run(
             self.dispatch.command,
             command,
             value=value,
@@ -87,6 +88,22 @@ class AsyncDatabase(AsyncBaseProperty):
             **kwargs,
         )
 
+    def cached(
+        self, name: str, *, ttl: Optional[float] = 300, maxsize: int = 128
+    ) -> AsyncCachedCollection:
+        """Returns a collection that serves find_one by _id from memory.
+
+        The same object is returned for every call with the same name, so writes
+        made through any of them invalidate the shared cache. ``ttl`` and
+        ``maxsize`` only apply on the first call.
+        """
+        try:
+            return self._cached_collections[name]
+        except KeyError:
+            collection = AsyncCachedCollection(self, name, ttl=ttl, maxsize=maxsize)
+            self._cached_collections[name] = collection
+            return collection
+
     async def close(self) -> None:
         await self._client.close()
 
@@ -105,7 +122,7 @@ class AsyncDatabase(AsyncBaseProperty):
         return AsyncCollection(
             self,
             name,
-            collection=await util.run_sync(
+            collection=await self._run(
                 self.dispatch.create_collection,
                 name,
                 codec_options=codec_options,
@@ -126,7 +143,7 @@ class AsyncDatabase(AsyncBaseProperty):
         session: Optional[AsyncClientSession] = None,
         **kwargs: Any,
     ) -> Optional[Mapping[str, Any]]:
-        return await util.run_sync(
+        return await self._run(
             self.dispatch.dereference,
             dbref,
             session=session.dispatch if session else session,
@@ -141,7 +158,7 @@ class AsyncDatabase(AsyncBaseProperty):
         if isinstance(name_or_collection, AsyncCollection):
             name_or_collection = name_or_collection.name
 
-        return await util.run_sync(
+        return await self._run(
             self.dispatch.drop_collection,
             name_or_collection,
             session=session.dispatch if session else session,
@@ -172,7 +189,7 @@ class AsyncDatabase(AsyncBaseProperty):
         query: Optional[Mapping[str, Any]] = None,
         **kwargs: Any,
     ) -> List[str]:
-        return await util.run_sync(
+        return await self._run(
             self.dispatch.list_collection_names,
             session=session.dispatch if session else session,
             filter=query,
@@ -189,7 +206,7 @@ class AsyncDatabase(AsyncBaseProperty):
         cmd = SON([("listCollections", 1)])
         cmd.update(query, **kwargs)
 
-        res: Mapping[str, Any] = await util.run_sync(
+        res: Mapping[str, Any] = await self._run(
             self.dispatch._retryable_read_command,  # skipcq: PYL-W0212
             cmd,
             session=session.dispatch if session else session,
@@ -208,7 +225,7 @@ class AsyncDatabase(AsyncBaseProperty):
         if isinstance(name_or_collection, AsyncCollection):
             name_or_collection = name_or_collection.name
 
-        return await util.run_sync(
+        return await self._run(
             self.dispatch.validate_collection,
             name_or_collection,
             scandata=scandata,
@@ -270,6 +287,10 @@ class AsyncDatabase(AsyncBaseProperty):
     def client(self) -> "AsyncClient":
         return self._client
 
+    @property
+    def executor(self) -> "AsyncExecutor":
+        return self._client.executor
+
     @property
     def name(self) -> str:
         return self.dispatch.name
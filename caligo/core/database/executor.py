@@ -0,0 +1,88 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Mapping, TypeVar
+
+from .monitoring import LatencyHistogram
+
+Result = TypeVar("Result")
+
+
+class AsyncExecutor(ThreadPoolExecutor):
+    """Thread pool running the blocking pymongo calls of an :obj:`~AsyncClient`
+
+    Keeps track of how many calls are waiting for a free thread and how long
+    they waited, so database slowness can be told apart from queueing.
+    """
+
+    queued: int
+    running: int
+    completed: int
+    waits: LatencyHistogram
+
+    def __init__(self, max_workers: int) -> None:
+        super().__init__(max_workers, thread_name_prefix="AsyncIOMongoDB")
+
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.waits = LatencyHistogram()
+
+        self._metrics_lock = threading.Lock()
+
+    def submit(  # pylint: disable=arguments-differ
+        self, fn: Callable[..., Result], /, *args: Any, **kwargs: Any
+    ) -> "Future[Result]":
+        submitted = time.perf_counter()
+
+        def run() -> Result:
+            wait = time.perf_counter() - submitted
+            with self._metrics_lock:
+                self.queued -= 1
+                self.running += 1
+                self.waits.add(wait)
+
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._metrics_lock:
+                    self.running -= 1
+                    self.completed += 1
+
+        with self._metrics_lock:
+            self.queued += 1
+
+        try:
+            future = super().submit(run)
+        except RuntimeError:
+            # Executor has been shut down
+            with self._metrics_lock:
+                self.queued -= 1
+
+            raise
+
+        def on_done(fut: "Future[Result]") -> None:
+            # Calls cancelled while waiting for a thread never run
+            if fut.cancelled():
+                with self._metrics_lock:
+                    self.queued -= 1
+
+        future.add_done_callback(on_done)
+        return future
+
+    def stats(self) -> Mapping[str, Any]:
+        """Returns a snapshot of the queueing metrics."""
+
+        with self._metrics_lock:
+            return {
+                "workers": self._max_workers,
+                "queued": self.queued,
+                "running": self.running,
+                "completed": self.completed,
+                "waits": self.waits.copy(),
+            }
+
+    def reset(self) -> None:
+        with self._metrics_lock:
+            self.completed = 0
+            self.waits = LatencyHistogram()
@@ -0,0 +1,138 @@
+import bisect
+import threading
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from pymongo.monitoring import (
+    CommandFailedEvent,
+    CommandListener,
+    CommandStartedEvent,
+    CommandSucceededEvent,
+)
+
+
+class LatencyHistogram:
+    """Counts latencies into power-of-two millisecond buckets.
+
+    Not thread-safe on its own, owners are expected to hold a lock while adding.
+    """
+
+    # Upper bounds of each bucket in milliseconds, the last bucket is unbounded
+    BOUNDS = tuple(2.0**i for i in range(-2, 14))
+
+    buckets: List[int]
+    count: int
+    total: float
+    max: float
+
+    def __init__(self) -> None:
+        self.buckets = [0] * (len(self.BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float) -> None:
+        ms = seconds * 1000
+        self.buckets[bisect.bisect_left(self.BOUNDS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+
+    def copy(self) -> "LatencyHistogram":
+        hist = LatencyHistogram()
+        hist.buckets = self.buckets.copy()
+        hist.count = self.count
+        hist.total = self.total
+        hist.max = self.max
+        return hist
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, pct: float) -> float:
+        """Returns the upper bound in milliseconds of the bucket holding the percentile."""
+
+        if not self.count:
+            return 0.0
+
+        target = self.count * pct / 100
+        seen = 0
+        for bound, count in zip(self.BOUNDS, self.buckets):
+            seen += count
+            if seen >= target:
+                return min(bound, self.max)
+
+        return self.max
+
+
+class CommandMonitor(CommandListener):
+    """Collects per-command, per-collection latencies of a :obj:`~MongoClient`
+
+    Durations are measured by the driver from sending the command until its
+    reply was read, so they cover the network and the server but not the time
+    spent waiting for an executor thread.
+    """
+
+    histograms: Dict[Tuple[str, str], LatencyHistogram]
+    failures: Dict[Tuple[str, str], int]
+
+    def __init__(self) -> None:
+        self.histograms = {}
+        self.failures = {}
+
+        self._lock = threading.Lock()
+        self._pending: Dict[Tuple[Any, int], Tuple[str, str]] = {}
+
+    @staticmethod
+    def _collection(event: CommandStartedEvent) -> str:
+        if event.command_name == "getMore":
+            target = event.command.get("collection")
+        else:
+            target = event.command.get(event.command_name)
+
+        if isinstance(target, str):
+            return f"{event.database_name}.{target}"
+
+        return event.database_name
+
+    def _finish(self, event: Any, failed: bool) -> None:
+        with self._lock:
+            key = self._pending.pop((event.connection_id, event.request_id), None)
+            if key is None:
+                return
+
+            try:
+                hist = self.histograms[key]
+            except KeyError:
+                hist = self.histograms[key] = LatencyHistogram()
+
+            hist.add(event.duration_micros / 1000000)
+            if failed:
+                self.failures[key] = self.failures.get(key, 0) + 1
+
+    def started(self, event: CommandStartedEvent) -> None:
+        key = (event.command_name, self._collection(event))
+        with self._lock:
+            self._pending[(event.connection_id, event.request_id)] = key
+
+    def succeeded(self, event: CommandSucceededEvent) -> None:
+        self._finish(event, False)
+
+    def failed(self, event: CommandFailedEvent) -> None:
+        self._finish(event, True)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.histograms.clear()
+            self.failures.clear()
+
+    def snapshot(
+        self,
+    ) -> Mapping[Tuple[str, str], Tuple[LatencyHistogram, Optional[int]]]:
+        """Returns a copy of the histograms and failure counts per (command, namespace)."""
+
+        with self._lock:
+            return {
+                key: (hist.copy(), self.failures.get(key))
+                for key, hist in self.histograms.items()
+            }
@@ -0,0 +1,150 @@
+import struct
+from typing import Any, Dict, Iterator, Optional, Tuple, Union
+
+import bson
+from bson.codec_options import DEFAULT_CODEC_OPTIONS, CodecOptions
+from bson.errors import InvalidBSON
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+_INT32 = struct.Struct("<i")
+
+# Value sizes of the element types that don't carry their own length
+_FIXED_SIZES = {
+    0x01: 8,  # double
+    0x06: 0,  # undefined
+    0x07: 12,  # ObjectId
+    0x08: 1,  # boolean
+    0x09: 8,  # UTC datetime
+    0x0A: 0,  # null
+    0x10: 4,  # int32
+    0x11: 8,  # timestamp
+    0x12: 8,  # int64
+    0x13: 16,  # decimal128
+    0x7F: 0,  # max key
+    0xFF: 0,  # min key
+}
+# Element types prefixed by an int32 length that doesn't count itself
+_STRING_TYPES = {0x02, 0x0D, 0x0E}
+# Element types prefixed by an int32 length that counts itself
+_DOCUMENT_TYPES = {0x03, 0x04, 0x0F}
+
+
+def iter_documents(batch: Buffer) -> Iterator[memoryview]:
+    """Yields a view over each document of a raw BSON batch without copying it."""
+
+    view = memoryview(batch)
+    offset = 0
+    end = len(view)
+    while offset < end:
+        (size,) = _INT32.unpack_from(view, offset)
+        if size < 5 or offset + size > end:
+            raise InvalidBSON("Invalid document length in raw batch")
+
+        yield view[offset : offset + size]
+        offset += size
+
+
+def _cstring_end(view: memoryview, offset: int) -> int:
+    end = len(view)
+    while offset < end and view[offset]:
+        offset += 1
+
+    if offset >= end:
+        raise InvalidBSON("Unterminated cstring")
+
+    return offset
+
+
+def _value_size(view: memoryview, elem_type: int, offset: int) -> int:
+    try:
+        return _FIXED_SIZES[elem_type]
+    except KeyError:
+        pass
+
+    if elem_type in _STRING_TYPES:
+        return 4 + _INT32.unpack_from(view, offset)[0]
+    if elem_type in _DOCUMENT_TYPES:
+        return _INT32.unpack_from(view, offset)[0]
+    if elem_type == 0x05:  # binary
+        return 5 + _INT32.unpack_from(view, offset)[0]
+    if elem_type == 0x0B:  # regex
+        return _cstring_end(view, _cstring_end(view, offset) + 1) + 1 - offset
+    if elem_type == 0x0C:  # DBPointer
+        return 16 + _INT32.unpack_from(view, offset)[0]
+
+    raise InvalidBSON(f"Unknown element type 0x{elem_type:02x}")
+
+
+def _find_element(view: memoryview, name: bytes) -> Optional[Tuple[int, int, int]]:
+    """Returns the type, start and value start of a top-level element."""
+
+    offset = 4
+    end = len(view) - 1  # Skip the document terminator
+    while offset < end:
+        elem_type = view[offset]
+        name_end = _cstring_end(view, offset + 1)
+        value_start = name_end + 1
+        if view[offset + 1 : name_end] == name:
+            return elem_type, offset, value_start
+
+        offset = value_start + _value_size(view, elem_type, value_start)
+
+    return None
+
+
+def _decode_element(
+    view: memoryview, elem_type: int, start: int, value_start: int, opts: CodecOptions
+) -> Any:
+    end = value_start + _value_size(view, elem_type, value_start)
+    # Wrap only this element in a document of its own and decode that
+    doc = _INT32.pack(end - start + 5) + view[start:end].tobytes() + b"\x00"
+    return next(iter(bson.decode(doc, opts).values()))
+
+
+def get_field(
+    document: Buffer,
+    path: str,
+    default: Any = None,
+    *,
+    codec_options: CodecOptions = DEFAULT_CODEC_OPTIONS,
+) -> Any:
+    """Decodes a single field of a raw BSON document, dotted paths included.
+
+    Only the requested element is decoded; the rest of the document is skipped
+    over by its length prefixes.
+    """
+
+    view = memoryview(document)
+    parts = path.split(".")
+    for i, part in enumerate(parts):
+        found = _find_element(view, part.encode())
+        if found is None:
+            return default
+
+        elem_type, start, value_start = found
+        if i == len(parts) - 1:
+            return _decode_element(view, elem_type, start, value_start, codec_options)
+
+        if elem_type not in (0x03, 0x04):
+            return default
+
+        size = _INT32.unpack_from(view, value_start)[0]
+        view = view[value_start : value_start + size]
+
+    return default
+
+
+def project(
+    document: Buffer, *fields: str, codec_options: CodecOptions = DEFAULT_CODEC_OPTIONS
+) -> Dict[str, Any]:
+    """Decodes the given fields of a raw BSON document, leaving out missing ones."""
+
+    missing = object()
+    result = {}
+    for field in fields:
+        value = get_field(document, field, missing, codec_options=codec_options)
+        if value is not missing:
+            result[field] = value
+
+    return result
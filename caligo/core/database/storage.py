@@ -1,9 +1,9 @@
 # Taken from https://github.com/animeshxd/pyromongo
 
 import asyncio
-import inspect
+import logging
 import time
-from typing import Any, List, Optional, Tuple, Union
+from typing import Any, Dict, List, Mapping, Optional, Set, Tuple, Union
 
 from pymongo import UpdateOne
 from pyrogram.raw.types.input_peer_channel import InputPeerChannel
@@ -12,8 +12,13 @@ from pyrogram.raw.types.input_peer_user import InputPeerUser
 from pyrogram.storage.sqlite_storage import get_input_peer
 from pyrogram.storage.storage import Storage
 
+from caligo import util
+
 from . import AsyncDatabase
 
+# id, access_hash, type, username, phone_number, last_update_on
+Peer = Tuple[int, int, str, Optional[str], Optional[str], int]
+
 
 class PersistentStorage(Storage):
     """
@@ -21,22 +26,62 @@ class PersistentStorage(Storage):
         required database object of AsyncDatabase
     remove_peers: bool = False
         remove peers collection on logout (by default, it will not remove peers)
+    peer_cache_size: int = 4096
+        maximum number of peers kept in memory
+    peer_cache_ttl: Optional[float] = 3600
+        seconds before a cached peer is looked up from the database again
+    flush_interval: float = 5
+        seconds between writes of buffered peer updates into the database
+    max_pending_peers: int = 1000
+        number of buffered peer updates that triggers an early write
     """
 
     db: AsyncDatabase
     lock: asyncio.Lock
+    log: logging.Logger
+    peer_cache: util.cache.LRUCache[int, Peer]
     USERNAME_TTL = 8 * 60 * 60
-
-    def __init__(self, database: AsyncDatabase, remove_peers: bool = False) -> None:
+    # Unchanged peers are still rewritten after this long to keep usernames fresh
+    PEER_REFRESH_INTERVAL = USERNAME_TTL // 2
+
+    def __init__(
+        self,
+        database: AsyncDatabase,
+        remove_peers: bool = False,
+        *,
+        peer_cache_size: int = 4096,
+        peer_cache_ttl: Optional[float] = 3600,
+        flush_interval: float = 5,
+        max_pending_peers: int = 1000,
+    ) -> None:
         # Propagate initialization
         super().__init__("")
 
         self.db = database
         self.lock = asyncio.Lock()
+        self.log = logging.getLogger("Storage")
+        self.peer_cache = util.cache.LRUCache(
+            peer_cache_size, ttl=peer_cache_ttl, on_evict=self._uncache_peer
+        )
+        self.flush_interval = flush_interval
+        self.max_pending_peers = max_pending_peers
 
+        self._flush_task: Optional[asyncio.Task[None]] = None
         self._peer = database["PEERS"]
+        # Peers as last written to the database, and updates waiting to be written.
+        # Forgetting a written peer only costs one redundant upsert.
+        self._peer_state: util.cache.LRUCache[int, Peer] = util.cache.LRUCache(
+            peer_cache_size
+        )
+        self._pending_peers: Dict[int, Peer] = {}
+        self._peer_usernames: Dict[str, int] = {}
+        self._peer_phone_numbers: Dict[str, int] = {}
         self._remove_peers = remove_peers
         self._session = database["SESSION"]
+        # In-memory copy of the session document and the fields not yet written
+        self._session_data: Dict[str, Any] = {}
+        self._session_dirty: Set[str] = set()
+        self._session_flush: Optional[asyncio.Task[None]] = None
 
     async def open(self) -> None:
         """
@@ -49,134 +94,290 @@ class PersistentStorage(Storage):
         is_bot    INTEGER
         """
 
-        if await self._session.find_one({"_id": 0}, {}):
+        if self._flush_task is None:
+            self._flush_task = asyncio.get_event_loop().create_task(
+                self._flush_peers_loop()
+            )
+
+        data = await self._session.find_one({"_id": 0})
+        if data:
+            self._session_data = data
             return
 
-        await self._session.insert_one(
-            {
-                "_id": 0,
-                "dc_id": 2,
-                "api_id": None,
-                "test_mode": None,
-                "auth_key": b"",
-                "date": 0,
-                "user_id": 0,
-                "is_bot": 0,
-            }
-        )
+        data = {
+            "_id": 0,
+            "dc_id": 2,
+            "api_id": None,
+            "test_mode": None,
+            "auth_key": b"",
+            "date": 0,
+            "user_id": 0,
+            "is_bot": 0,
+        }
+        await self._session.insert_one(data)
+        self._session_data = data
 
     async def save(self) -> None:
-        pass
+        await self.flush_session()
+        await self.flush_peers()
 
     async def close(self) -> None:
-        pass
+        if self._flush_task is not None:
+            # A flush cut short puts its batch back, wait for that before the
+            # final flush
+            self._flush_task.cancel()
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+            self._flush_task = None
+
+        await self.flush_session()
+        await self.flush_peers()
 
     async def delete(self) -> None:
         try:
+            self._session_data = {}
+            self._session_dirty.clear()
             await self._session.delete_one({"_id": 0})
             if self._remove_peers:
+                self._pending_peers.clear()
+                self._peer_state.clear()
                 await self._peer.delete_many({})
+                self._clear_peer_cache()
         except Exception:  # skipcq: PYL-W0703
             return
 
+    def _uncache_peer(self, peer_id: int, peer: Peer) -> None:
+        """Drops the index entries that still point to the given peer."""
+
+        if peer[3] and self._peer_usernames.get(peer[3]) == peer_id:
+            del self._peer_usernames[peer[3]]
+        if peer[4] and self._peer_phone_numbers.get(peer[4]) == peer_id:
+            del self._peer_phone_numbers[peer[4]]
+
+    def _cache_peer(self, peer: Peer) -> None:
+        peer_id, _, __, username, phone_number, ___ = peer
+
+        # Drop index entries that still point to the previous values of this peer
+        old = self.peer_cache.pop(peer_id)
+        if old is not None:
+            self._uncache_peer(peer_id, old)
+
+        self.peer_cache.put(peer_id, peer)
+        if username:
+            self._peer_usernames[username] = peer_id
+        if phone_number:
+            self._peer_phone_numbers[phone_number] = peer_id
+
+    def _cache_peer_document(self, doc: Mapping[str, Any]) -> Peer:
+        peer: Peer = (
+            doc["_id"],
+            doc["access_hash"],
+            doc["type"],
+            doc.get("username"),
+            doc.get("phone_number"),
+            doc.get("last_update_on", 0),
+        )
+        self._cache_peer(peer)
+        self._peer_state.put(peer[0], peer)
+        return peer
+
+    def _get_cached_peer(self, peer_id: Optional[int]) -> Optional[Peer]:
+        peer = self.peer_cache.get(peer_id)
+        if peer is not None or peer_id is None:
+            return peer
+
+        # Evicted peers may still be waiting to be written
+        peer = self._pending_peers.get(peer_id)
+        if peer is not None:
+            self._cache_peer(peer)
+
+        return peer
+
+    def _clear_peer_cache(self) -> None:
+        self.peer_cache.clear()
+        self._peer_usernames.clear()
+        self._peer_phone_numbers.clear()
+
     async def update_peers(self, peers: List[Tuple[int, int, str, str, str]]) -> None:
         """(id, access_hash, type, username, phone_number)"""
         s = int(time.time())
-        bulk = [
-            UpdateOne(
-                {"_id": i[0]},
-                {
-                    "$set": {
-                        "access_hash": i[1],
-                        "type": i[2],
-                        "username": i[3],
-                        "phone_number": i[4],
-                        "last_update_on": s,
-                    }
-                },
-                upsert=True,
-            )
-            for i in peers
-        ]
-        if not bulk:
-            return
-
-        await self._peer.bulk_write(bulk)
+        for i in peers:
+            peer: Peer = (*i, s)  # type: ignore
+            self._cache_peer(peer)
+
+            # Skip peers whose stored values are still current
+            known = self._peer_state.get(peer[0])
+            if (
+                known is not None
+                and known[1:5] == peer[1:5]
+                and s - known[5] < self.PEER_REFRESH_INTERVAL
+            ):
+                self._pending_peers.pop(peer[0], None)
+                continue
+
+            # Later updates of the same peer replace the buffered one
+            self._pending_peers[peer[0]] = peer
+
+        if len(self._pending_peers) >= self.max_pending_peers:
+            await self.flush_peers()
+
+    async def flush_peers(self) -> None:
+        """Writes all buffered peer updates into the database."""
+
+        async with self.lock:
+            if not self._pending_peers:
+                return
+
+            pending, self._pending_peers = self._pending_peers, {}
+            bulk = [
+                UpdateOne(
+                    {"_id": i[0]},
+                    {
+                        "$set": {
+                            "access_hash": i[1],
+                            "type": i[2],
+                            "username": i[3],
+                            "phone_number": i[4],
+                            "last_update_on": i[5],
+                        }
+                    },
+                    upsert=True,
+                )
+                for i in pending.values()
+            ]
+
+            try:
+                await self._peer.bulk_write(bulk, ordered=False)
+            except BaseException:
+                # Put back the peers that haven't been updated again meanwhile,
+                # also when cancelled
+                for peer_id, peer in pending.items():
+                    self._pending_peers.setdefault(peer_id, peer)
+
+                raise
+
+            for peer_id, peer in pending.items():
+                self._peer_state.put(peer_id, peer)
+
+    async def _flush_peers_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+
+            try:
+                await self.flush_peers()
+            except Exception as e:  # skipcq: PYL-W0703
+                self.log.warning("Failed to write peers into database", exc_info=e)
 
     async def get_peer_by_id(
         self, peer_id: int
     ) -> Union[InputPeerUser, InputPeerChat, InputPeerChannel]:
         # id, access_hash, type
-        res = await self._peer.find_one(
-            {"_id": peer_id}, {"_id": 1, "access_hash": 1, "type": 1}
-        )
-        if not res:
-            raise KeyError(f"ID not found: {peer_id}")
+        peer = self._get_cached_peer(peer_id)
+        if peer is None:
+            res = await self._peer.find_one({"_id": peer_id})
+            if not res:
+                raise KeyError(f"ID not found: {peer_id}")
+
+            peer = self._cache_peer_document(res)
 
-        return get_input_peer(*res.values())
+        return get_input_peer(*peer[:3])
 
     async def get_peer_by_username(
         self, username: str
     ) -> Union[InputPeerUser, InputPeerChat, InputPeerChannel]:
         # id, access_hash, type, last_update_on,
-        res = await self._peer.find_one(
-            {"username": username},
-            {"_id": 1, "access_hash": 1, "type": 1, "last_update_on": 1},
-        )
+        peer = self._get_cached_peer(self._peer_usernames.get(username))
+        if peer is None or peer[3] != username:
+            self._peer_usernames.pop(username, None)
+            res = await self._peer.find_one({"username": username})
+            if not res:
+                raise KeyError(f"Username not found: {username}")
 
-        if not res:
-            raise KeyError(f"Username not found: {username}")
+            peer = self._cache_peer_document(res)
 
-        if abs(time.time() - res["last_update_on"]) > self.USERNAME_TTL:
+        if abs(time.time() - peer[5]) > self.USERNAME_TTL:
             raise KeyError(f"Username expired: {username}")
 
-        return get_input_peer(res["_id"], res["access_hash"], res["type"])
+        return get_input_peer(*peer[:3])
 
     async def get_peer_by_phone_number(
         self, phone_number: str
     ) -> Union[InputPeerUser, InputPeerChat, InputPeerChannel]:
         #  _id, access_hash, type,
-        res = await self._peer.find_one(
-            {"phone_number": phone_number}, {"_id": 1, "access_hash": 1, "type": 1}
-        )
+        peer = self._get_cached_peer(self._peer_phone_numbers.get(phone_number))
+        if peer is None or peer[4] != phone_number:
+            self._peer_phone_numbers.pop(phone_number, None)
+            res = await self._peer.find_one({"phone_number": phone_number})
+            if not res:
+                raise KeyError(f"Phone number not found: {phone_number}")
 
-        if not res:
-            raise KeyError(f"Phone number not found: {phone_number}")
+            peer = self._cache_peer_document(res)
 
-        return get_input_peer(*res.values())
+        return get_input_peer(*peer[:3])
 
-    async def _get(self) -> Optional[Any]:
-        attr = inspect.stack()[2].function
-        data = await self._session.find_one({"_id": 0}, {attr: 1})
-        if not data:
-            return
+    async def flush_session(self) -> None:
+        """Writes the changed session fields into the database."""
 
-        return data[attr]
+        async with self.lock:
+            if not self._session_dirty:
+                return
 
-    async def _set(self, value: Any) -> None:
-        attr = inspect.stack()[2].function
-        await self._session.update_one({"_id": 0}, {"$set": {attr: value}}, upsert=True)
+            fields = {key: self._session_data.get(key) for key in self._session_dirty}
+            self._session_dirty.clear()
 
-    async def _accessor(self, value: Any = object) -> Any:
-        return await self._get() if value == object else await self._set(value)
+            try:
+                await self._session.update_one(
+                    {"_id": 0}, {"$set": fields}, upsert=True
+                )
+            except BaseException:
+                self._session_dirty.update(fields)
+                raise
+
+    async def _flush_session_soon(self) -> None:
+        try:
+            await self.flush_session()
+        except Exception as e:  # skipcq: PYL-W0703
+            self.log.warning("Failed to write session into database", exc_info=e)
+        finally:
+            self._session_flush = None
+
+    async def _get(self, attr: str) -> Optional[Any]:
+        if not self._session_data:
+            self._session_data = await self._session.find_one({"_id": 0}) or {}
+
+        return self._session_data.get(attr)
+
+    async def _set(self, attr: str, value: Any) -> None:
+        self._session_data[attr] = value
+        self._session_dirty.add(attr)
+
+        # Fields set back to back are written together
+        if self._session_flush is None:
+            self._session_flush = asyncio.get_event_loop().create_task(
+                self._flush_session_soon()
+            )
+
+    async def _accessor(self, attr: str, value: Any = object) -> Any:
+        return (
+            await self._get(attr) if value == object else await self._set(attr, value)
+        )
 
     async def dc_id(self, value=object) -> Optional[int]:
-        return await self._accessor(value)
+        return await self._accessor("dc_id", value)
 
     async def api_id(self, value=object) -> Optional[int]:
-        return await self._accessor(value)
+        return await self._accessor("api_id", value)
 
     async def test_mode(self, value=object) -> Optional[bool]:
-        return await self._accessor(value)
+        return await self._accessor("test_mode", value)
 
     async def auth_key(self, value=object) -> Optional[bytes]:
-        return await self._accessor(value)
+        return await self._accessor("auth_key", value)
 
     async def date(self, value=object) -> Optional[int]:
-        return await self._accessor(value)
+        return await self._accessor("date", value)
 
     async def user_id(self, value=object) -> Optional[int]:
-        return await self._accessor(value)
+        return await self._accessor("user_id", value)
 
     async def is_bot(self, value=object) -> Optional[bool]:
-        return await self._accessor(value)
+        return await self._accessor("is_bot", value)
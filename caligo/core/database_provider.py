@@ -11,7 +11,11 @@ class DatabaseProvider(CaligoBase):
     db: AsyncDatabase
 
     def __init__(self: "Caligo", **kwargs: Any) -> None:
-        client = AsyncClient(self.config["bot"]["db_uri"], connect=False)
+        client = AsyncClient(
+            self.config["bot"]["db_uri"],
+            connect=False,
+            executor_workers=self.config["bot"].get("db_executor_workers"),
+        )
         self.db = client.get_database("CALIGO")
 
         # Propagate initialization to other mixins
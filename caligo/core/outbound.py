@@ -0,0 +1,212 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    Hashable,
+    List,
+    MutableMapping,
+    Optional,
+    TypeVar,
+)
+
+from pyrogram.errors import FloodWait
+
+Result = TypeVar("Result")
+
+
+class _Job:
+    func: Callable[[], Awaitable[Any]]
+    coalesce_key: Optional[Hashable]
+    waiters: List["asyncio.Future[Any]"]
+
+    def __init__(
+        self, func: Callable[[], Awaitable[Any]], coalesce_key: Optional[Hashable]
+    ) -> None:
+        self.func = func
+        self.coalesce_key = coalesce_key
+        self.waiters = []
+
+
+class _Lane:
+    jobs: Deque[_Job]
+    coalescing: MutableMapping[Hashable, _Job]
+    task: Optional["asyncio.Task[None]"]
+
+    tokens: float
+    updated_at: float
+
+    def __init__(self, burst: int) -> None:
+        self.jobs = deque()
+        self.coalescing = {}
+        self.task = None
+
+        self.tokens = burst
+        self.updated_at = time.monotonic()
+
+
+class OutboundScheduler:
+    """Queues outgoing Telegram calls into one lane per chat
+
+    Each lane runs its calls in order, paced by a token bucket of ``rate`` calls
+    per second with bursts of up to ``burst`` calls. A FloodWait only puts the
+    lane of the chat it came from to sleep before the call is retried. Calls
+    sharing a coalescing key that are still waiting in a lane are merged, so
+    only the latest one is sent and every caller gets its result.
+    """
+
+    log: logging.Logger
+    rate: float
+    burst: int
+
+    lanes: Dict[int, _Lane]
+    closed: bool
+
+    def __init__(self, *, rate: float = 1, burst: int = 3) -> None:
+        if rate <= 0 or burst < 1:
+            raise ValueError("rate and burst must be positive")
+
+        self.log = logging.getLogger("Outbound")
+        self.rate = rate
+        self.burst = burst
+
+        self.lanes = {}
+        self.closed = False
+
+    def _get_lane(self, chat_id: int) -> _Lane:
+        try:
+            return self.lanes[chat_id]
+        except KeyError:
+            pass
+
+        # Forget idle lanes whose bucket has refilled anyway
+        now = time.monotonic()
+        for key, lane in list(self.lanes.items()):
+            if lane.task is None and (
+                lane.tokens + (now - lane.updated_at) * self.rate >= self.burst
+            ):
+                del self.lanes[key]
+
+        lane = self.lanes[chat_id] = _Lane(self.burst)
+        return lane
+
+    async def _take_token(self, lane: _Lane) -> None:
+        now = time.monotonic()
+        lane.tokens = min(self.burst, lane.tokens + (now - lane.updated_at) * self.rate)
+        lane.updated_at = now
+
+        if lane.tokens < 1:
+            delay = (1 - lane.tokens) / self.rate
+            await asyncio.sleep(delay)
+
+            lane.tokens = 1
+            lane.updated_at = time.monotonic()
+
+        lane.tokens -= 1
+
+    async def _call(self, chat_id: int, lane: _Lane, job: _Job) -> Any:
+        while True:
+            await self._take_token(lane)
+            try:
+                return await job.func()
+            except FloodWait as e:
+                wait = e.value if isinstance(e.value, (int, float)) else 1
+                self.log.info(
+                    "Hit FloodWait in chat %d, pausing it for %s seconds", chat_id, wait
+                )
+                lane.tokens = 0
+                await asyncio.sleep(wait)
+
+    async def _run_lane(self, chat_id: int, lane: _Lane) -> None:
+        try:
+            while lane.jobs:
+                job = lane.jobs.popleft()
+                if job.coalesce_key is not None:
+                    del lane.coalescing[job.coalesce_key]
+
+                # Everyone waiting on this call gave up
+                waiters = [fut for fut in job.waiters if not fut.done()]
+                if not waiters:
+                    continue
+
+                try:
+                    result = await self._call(chat_id, lane, job)
+                except asyncio.CancelledError:
+                    for fut in waiters:
+                        fut.cancel()
+
+                    raise
+                except Exception as e:  # skipcq: PYL-W0703
+                    for fut in waiters:
+                        if not fut.done():
+                            fut.set_exception(e)
+                else:
+                    for fut in waiters:
+                        if not fut.done():
+                            fut.set_result(result)
+        finally:
+            lane.task = None
+
+    async def submit(
+        self,
+        chat_id: int,
+        func: Callable[..., Awaitable[Result]],
+        *args: Any,
+        coalesce_key: Optional[Hashable] = None,
+        **kwargs: Any,
+    ) -> Result:
+        """Queues ``func(*args, **kwargs)`` in the lane of the chat and waits for it.
+
+        If a call with the same ``coalesce_key`` is still queued in that lane, it
+        is replaced by this one.
+        """
+
+        if self.closed:
+            raise RuntimeError("Outbound scheduler is closed")
+
+        lane = self._get_lane(chat_id)
+        fut: "asyncio.Future[Result]" = asyncio.get_running_loop().create_future()
+
+        def call() -> Awaitable[Result]:
+            return func(*args, **kwargs)
+
+        job = lane.coalescing.get(coalesce_key) if coalesce_key is not None else None
+        if job is not None:
+            job.func = call
+        else:
+            job = _Job(call, coalesce_key)
+            lane.jobs.append(job)
+            if coalesce_key is not None:
+                lane.coalescing[coalesce_key] = job
+
+        job.waiters.append(fut)
+
+        if lane.task is None:
+            lane.task = asyncio.create_task(self._run_lane(chat_id, lane))
+
+        return await fut
+
+    async def close(self) -> None:
+        """Cancels all lanes, calls that haven't been sent yet are cancelled."""
+
+        self.closed = True
+
+        tasks = []
+        for lane in self.lanes.values():
+            for job in lane.jobs:
+                for fut in job.waiters:
+                    fut.cancel()
+
+            lane.jobs.clear()
+            lane.coalescing.clear()
+            if lane.task is not None:
+                lane.task.cancel()
+                tasks.append(lane.task)
+
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.lanes.clear()
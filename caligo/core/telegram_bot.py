@@ -1,8 +1,26 @@
 import asyncio
+import io
+import os
+import re
 import signal
 from functools import partial
 from hashlib import sha256
-from typing import TYPE_CHECKING, Any, List, Optional, Type, Union
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    BinaryIO,
+    Callable,
+    List,
+    Optional,
+    Pattern,
+    Tuple,
+    Type,
+    Union,
+)
 
 from aiopath import AsyncPath
 from pyrogram import filters as filt
@@ -15,10 +33,12 @@ from pyrogram.handlers.inline_query_handler import InlineQueryHandler
 from pyrogram.handlers.message_handler import MessageHandler
 from pyrogram.types import CallbackQuery, InlineQuery, Message, User
 
-from caligo.util import tg, time
+from caligo.util import tg, time, transfer
+from caligo.util.file_cache import FileCache
 
 from .base import CaligoBase
 from .database.storage import PersistentStorage
+from .outbound import OutboundScheduler
 
 if TYPE_CHECKING:
     from .bot import Caligo
@@ -28,11 +48,15 @@ Handler = Union[
 ]
 Update = Union[CallbackQuery, InlineQuery, List[Message], Message]
 
+# Characters of a single line buffered while redacting streamed text
+REDACT_LINE_MAX = 64 * 1024
+
 
 class TelegramBot(CaligoBase):
     bot_client: Client
     client: Client
-    prefix: str
+    file_cache: FileCache
+    outbound: OutboundScheduler
     user: User
     uid: int
     start_time_us: int
@@ -42,6 +66,12 @@ class TelegramBot(CaligoBase):
 
     __idle__: asyncio.Task[None]
 
+    _prefix: str
+    _prefix_len: int
+
+    _redact_secrets: Tuple[str, ...]
+    _redact_pattern: Optional[Pattern[str]]
+
     def __init__(self: "Caligo", **kwargs: Any) -> None:
         self.loaded = False
 
@@ -49,6 +79,18 @@ class TelegramBot(CaligoBase):
 
         self.__idle__ = None  # type: ignore
 
+        self._redact_secrets = ()
+        self._redact_pattern = None
+
+        self.outbound = OutboundScheduler(
+            rate=self.config["bot"].get("outbound_rate", 1),
+            burst=self.config["bot"].get("outbound_burst", 3),
+        )
+        self.file_cache = FileCache(
+            "caligo/.cache/files",
+            self.config["bot"].get("download_cache_quota", 1024) * 1024 * 1024,
+        )
+
         super().__init__(**kwargs)
 
     async def init_client(self: "Caligo") -> None:
@@ -63,12 +105,17 @@ class TelegramBot(CaligoBase):
             workdir="caligo",
             in_memory=False,
             parse_mode=ParseMode.MARKDOWN,
+            # Every file of a media group may stream several chunk ranges at once
+            max_concurrent_transmissions=(
+                self.config["bot"].get("download_concurrency", 3)
+                * self.config["bot"].get("download_workers", 1)
+            ),
         )
         self.client.storage = PersistentStorage(self.db)  # type: ignore
 
         self.prefix = self.config["bot"]["prefix"]
         # Override default prefix if found any saved in database
-        data = await self.db["MAIN"].find_one({"_id": 0}, {"prefix": 1})
+        data = await self.db.cached("MAIN").find_one({"_id": 0}, {"prefix": 1})
         if data and data.get("prefix"):
             self.prefix = data["prefix"]
 
@@ -267,24 +314,170 @@ class TelegramBot(CaligoBase):
     def helper_initialized(self: "Caligo") -> bool:
         return hasattr(self, "client_helper") and isinstance(self.client_helper, Client)
 
+    @property
+    def prefix(self: "Caligo") -> str:
+        return self._prefix
+
+    @prefix.setter
+    def prefix(self: "Caligo", prefix: str) -> None:
+        # Precompute the length used to slice every incoming command
+        self._prefix = prefix
+        self._prefix_len = len(prefix)
+
+    def _get_redact_pattern(self: "Caligo") -> Optional[Pattern[str]]:
+        user = getattr(self, "user", None)
+        secrets = (
+            str(self.config["telegram"]["api_id"]),
+            self.config["telegram"]["api_hash"],
+            self.config["bot"]["db_uri"],
+            self.config["telegram"]["helper"].get("token"),
+            user.phone_number if user is not None else None,
+            *self.config["bot"].get("redact_extra", []),
+        )
+        secrets = tuple(str(secret) for secret in secrets if secret)
+
+        # Only recompile when a secret changed
+        if secrets != self._redact_secrets:
+            self._redact_secrets = secrets
+            # Longest first, so a secret containing another one is fully redacted
+            self._redact_pattern = (
+                re.compile(
+                    "|".join(
+                        re.escape(secret)
+                        for secret in sorted(set(secrets), key=len, reverse=True)
+                    )
+                )
+                if secrets
+                else None
+            )
+
+        return self._redact_pattern
+
     def redact_message(self: "Caligo", text: str) -> str:
-        redacted = "[REDACTED]"
+        pattern = self._get_redact_pattern()
+        if pattern is None:
+            return text
 
-        api_id = str(self.config["telegram"]["api_id"])
-        api_hash = self.config["telegram"]["api_hash"]
-        db_uri = self.config["bot"]["db_uri"]
-        bot_token = self.config["telegram"]["helper"].get("token")
+        return pattern.sub("[REDACTED]", text)
+
+    def _redact_split(self: "Caligo", text: str) -> int:
+        """Returns where to split an unfinished line so no secret is cut in two."""
+
+        pattern = self._get_redact_pattern()
+        if pattern is None:
+            return len(text)
+
+        # The rest has to be long enough to hold any secret that starts in it
+        end = len(text) - max(map(len, self._redact_secrets)) + 1
+        for match in pattern.finditer(text):
+            if match.start() >= end:
+                break
+            if match.end() > end:
+                return match.start()
+
+        return end
 
-        if api_id in text:
-            text = text.replace(api_id, redacted)
-        if api_hash in text:
-            text = text.replace(api_hash, redacted)
-        if db_uri in text:
-            text = text.replace(db_uri, redacted)
-        if bot_token is not None and bot_token in text:
-            text = text.replace(bot_token, redacted)
+    async def redact_lines(
+        self: "Caligo", chunks: AsyncIterable[str]
+    ) -> AsyncIterator[str]:
+        """Redacts streamed text, buffering it up to line breaks since secrets can't span lines.
 
-        return text
+        Lines longer than ``REDACT_LINE_MAX`` are let through in pieces, split
+        outside of any secret.
+        """
+
+        rest = ""
+        async for chunk in chunks:
+            rest += chunk
+            end = rest.rfind("\n") + 1
+            if not end and len(rest) > REDACT_LINE_MAX:
+                end = self._redact_split(rest)
+
+            if end:
+                yield self.redact_message(rest[:end])
+                rest = rest[end:]
+
+        if rest:
+            yield self.redact_message(rest)
+
+    async def download_media(
+        self: "Caligo",
+        message: Message,
+        *,
+        in_memory: bool = False,
+        directory: Optional[Union[str, os.PathLike]] = None,
+        progress: Optional[Callable[..., Awaitable[Any]]] = None,
+        progress_args: Tuple[Any, ...] = (),
+    ) -> Optional[Union[str, BinaryIO]]:
+        """Downloads the media of a message, reusing the cached file if any.
+
+        The file is placed in ``directory``, or the downloads directory like the
+        client does, unless ``in_memory`` is set, in which case a named
+        :obj:`io.BytesIO` is returned. Downloads to disk that got interrupted are resumed where they
+        stopped.
+        """
+
+        media = getattr(message, message.media.value) if message.media else None
+        unique_id = getattr(media, "file_unique_id", None)
+        if not unique_id:
+            return await self.client.download_media(
+                message,
+                in_memory=in_memory,
+                progress=progress,
+                progress_args=progress_args,
+            )
+
+        name = transfer.media_file_name(message)
+        if in_memory:
+            data = await self.file_cache.read(unique_id)
+            if data is not None:
+                file = io.BytesIO(data)
+                file.name = name
+                return file
+
+            file = await self.client.download_media(
+                message, in_memory=True, progress=progress, progress_args=progress_args
+            )
+            if file is not None:
+                try:
+                    await self.file_cache.put_bytes(
+                        unique_id, os.path.splitext(name)[1], file.getvalue()
+                    )
+                except OSError as e:
+                    self.log.warning("Failed to cache downloaded file", exc_info=e)
+
+            return file
+
+        directory = Path(directory or self.client.PARENT_DIR / "downloads")
+        path = await self.file_cache.get(unique_id, directory, name)
+        if path:
+            return path
+
+        if media.file_size:
+            path = await transfer.download(
+                self.client,
+                message,
+                directory / name,
+                workers=self.config["bot"].get("download_workers", 1),
+                progress=progress,
+                progress_args=progress_args,
+            )
+        else:
+            path = await self.client.download_media(
+                message,
+                # Absolute, so the client doesn't prepend its own parent directory
+                file_name=os.path.join(directory.absolute(), name),
+                progress=progress,
+                progress_args=progress_args,
+            )
+
+        if isinstance(path, str):
+            try:
+                await self.file_cache.put(unique_id, path)
+            except OSError as e:
+                self.log.warning("Failed to cache downloaded file", exc_info=e)
+
+        return path
 
     async def respond(
         self: "Caligo",
@@ -297,17 +490,29 @@ class TelegramBot(CaligoBase):
         response: Optional[Message] = None,
         **kwargs: Any,
     ) -> Message:
+        # Text sends and edits go through the chat's outbound lane, edits of the
+        # same message still waiting there are merged into the latest one.
+        # Documents are uploaded outside of it, so a long upload doesn't hold up
+        # the rest of the chat.
+        chat_id = msg.chat.id
+        outbound = self.outbound
+
         if text:
 
             if redact:
                 text = self.redact_message(text)
 
             # send as file if text > 4096
-            if len(str(text)) > tg.MESSAGE_CHAR_LIMIT:
-                await msg.edit("Sending output as a file.")
+            if tg.utf16_len(str(text)) > tg.MESSAGE_CHAR_LIMIT:
+                await outbound.submit(
+                    chat_id,
+                    msg.edit,
+                    "Sending output as a file.",
+                    coalesce_key=("edit", msg.id),
+                )
                 response = await tg.send_as_document(text, msg, input_arg)
 
-                await msg.delete()
+                await outbound.submit(chat_id, msg.delete)
                 return response
 
         # Default to disabling link previews in responses
@@ -319,28 +524,44 @@ class TelegramBot(CaligoBase):
             mode = "edit"
 
         if mode == "edit":
-            return await msg.edit(text=text, **kwargs)
+            return await outbound.submit(
+                chat_id, msg.edit, text=text, coalesce_key=("edit", msg.id), **kwargs
+            )
 
         if mode == "reply":
             if response is not None:
                 # Already replied, so just edit the existing reply to reduce spam
-                return await response.edit(text=text, **kwargs)
+                return await outbound.submit(
+                    chat_id,
+                    response.edit,
+                    text=text,
+                    coalesce_key=("edit", response.id),
+                    **kwargs,
+                )
 
             # Reply since we haven't done so yet
-            return await msg.reply(text, **kwargs)
+            return await outbound.submit(chat_id, msg.reply, text, **kwargs)
 
         if mode == "repost":
             if response is not None:
                 # Already reposted, so just edit the existing reply to reduce spam
-                return await response.edit(text=text, **kwargs)
+                return await outbound.submit(
+                    chat_id,
+                    response.edit,
+                    text=text,
+                    coalesce_key=("edit", response.id),
+                    **kwargs,
+                )
 
             # Repost since we haven't done so yet
             if kwargs.get("document"):
                 del kwargs["disable_web_page_preview"]
                 response = await msg.reply_document(**kwargs)
             else:
-                response = await msg.reply(text, reply_to_message_id=msg.id, **kwargs)
-            await msg.delete()
+                response = await outbound.submit(
+                    chat_id, msg.reply, text, reply_to_message_id=msg.id, **kwargs
+                )
+            await outbound.submit(chat_id, msg.delete)
             return response
 
         raise ValueError(f"Unknown response mode '{mode}'")
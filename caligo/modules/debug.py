@@ -90,6 +90,48 @@ class Debug(module.Module):
         )
         await ctx.respond(text, disable_web_page_preview=True)
 
+    @command.desc("Show database call latencies (pass `reset` to reset them)")
+    @command.usage('["reset" to reset latencies?]', optional=True)
+    @command.alias("dbs")
+    async def cmd_dbstats(self, ctx: command.Context) -> str:
+        client = self.bot.db.client
+        if ctx.input == "reset":
+            client.monitor.reset()
+            client.executor.reset()
+            return "__Database latencies have been reset.__"
+
+        executor = client.executor.stats()
+        waits = executor["waits"]
+        response = util.text.join_map(
+            {
+                "Threads": f"{executor['running']} busy of {executor['workers']}",
+                "Queued calls": executor["queued"],
+                "Completed calls": executor["completed"],
+                "Wait time": f"{waits.mean:.2f} ms avg • "
+                f"p95 ≤ {waits.percentile(95):.2f} ms • max {waits.max:.2f} ms",
+            },
+            heading="Executor",
+        )
+
+        # Slowest commands by total time spent first
+        commands = sorted(
+            client.monitor.snapshot().items(),
+            key=lambda item: item[1][0].total,
+            reverse=True,
+        )
+        if not commands:
+            return response + "\n\n__No database commands recorded yet.__"
+
+        latencies = {}
+        for (name, namespace), (hist, failures) in commands:
+            latencies[f"{name} {namespace}"] = (
+                f"{hist.count} calls • {hist.mean:.2f} ms avg • "
+                f"p95 ≤ {hist.percentile(95):.2f} ms • max {hist.max:.2f} ms"
+                + (f" • {failures} failed" if failures else "")
+            )
+
+        return response + "\n\n" + util.text.join_map(latencies, heading="Commands")
+
     @command.desc("Evaluate code")
     @command.usage("[code snippet]")
     @command.alias("exec")
@@ -190,12 +232,10 @@ class Debug(module.Module):
 <pre language="python">{escape(out)}</pre>
 
 Time: {el_str}"""
-        if len(respond_text) > 4096:
-            with io.BytesIO(str.encode(out)) as out_file:
-                out_file.name = "eval.text"
-                await ctx.msg.reply_document(
-                    document=out_file, caption=code, disable_notification=True
-                )
+        if util.tg.utf16_len(respond_text) > util.tg.MESSAGE_CHAR_LIMIT:
+            await util.tg.send_as_document(
+                out, ctx.msg, code, file_name="eval.txt", disable_notification=True
+            )
 
             return None
 
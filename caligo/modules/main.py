@@ -17,7 +17,7 @@ class Main(module.Module):
     db: database.AsyncCollection
 
     async def on_load(self) -> None:
-        self.db = self.bot.db[self.name.upper()]
+        self.db = self.bot.db.cached(self.name.upper())
 
     async def on_stop(self) -> None:
         file = AsyncPath("caligo/caligo_helper.session")
@@ -1,8 +1,11 @@
 import asyncio
+import os
 import re
 from datetime import datetime, timedelta
 from typing import Any, ClassVar, Literal, Optional, Set, Tuple
+from urllib.parse import unquote, urlparse
 
+import aiohttp
 from aiopath import AsyncPath
 from pyrogram.types import Message
 
@@ -19,9 +22,8 @@ async def prog_func(
     ctx: command.Context,
     file_name: str,
 ) -> None:
-    percent = current / total
+    percent = current / total if total else 0
     end_time = util.time.sec() - start_time
-    now = datetime.now()
 
     try:
         speed = round(current / end_time, 2)
@@ -30,35 +32,42 @@ async def prog_func(
         speed = 0
         eta = timedelta(seconds=0)
 
-    bullets = "●" * int(round(percent * 10)) + "○"
-    if len(bullets) > 10:
-        bullets = bullets.replace("○", "")
-
     status = "Uploading" if mode == "upload" else "Downloading"
-    space = "    " * (10 - len(bullets))
-    progress = (
-        f"`{file_name}`\n"
-        f"Status: **{status}**\n"
-        f"Progress: [{bullets + space}] {round(percent * 100)}%\n"
-        f"__{util.misc.human_readable_bytes(current)} of {util.misc.human_readable_bytes(total)} @ "
-        f"{util.misc.human_readable_bytes(speed, postfix='/s')}\n"
-        f"eta - {util.time.format_duration_td(eta)}__\n\n"
-    )
-
-    # Only edit message once every 5 seconds to avoid ratelimits
-    if (
-        ctx.last_update_time is None
-        or (now - ctx.last_update_time).total_seconds() >= 5
-    ):
-        await ctx.respond(progress)
-
-        ctx.last_update_time = now
+    if total:
+        bullets = "●" * int(round(percent * 10)) + "○"
+        if len(bullets) > 10:
+            bullets = bullets.replace("○", "")
+
+        space = "    " * (10 - len(bullets))
+        progress = (
+            f"`{file_name}`\n"
+            f"Status: **{status}**\n"
+            f"Progress: [{bullets + space}] {round(percent * 100)}%\n"
+            f"__{util.misc.human_readable_bytes(current)} of {util.misc.human_readable_bytes(total)} @ "
+            f"{util.misc.human_readable_bytes(speed, postfix='/s')}\n"
+            f"eta - {util.time.format_duration_td(eta)}__\n\n"
+        )
+    else:
+        # Streamed transfers don't know their size until they're over
+        progress = (
+            f"`{file_name}`\n"
+            f"Status: **{status}**\n"
+            f"__{util.misc.human_readable_bytes(current)} @ "
+            f"{util.misc.human_readable_bytes(speed, postfix='/s')}__\n\n"
+        )
+
+    # Edits are debounced to avoid ratelimits, but the last one must show up
+    if total and current >= total:
+        await ctx.progress.finish(progress)
+    else:
+        await ctx.progress.update(progress)
 
 
 class Network(module.Module):
     name: ClassVar[str] = "Network"
 
-    tasks: Set[Tuple[int, asyncio.Task[Any]]]
+    # Command message ID, transferred media message ID and the transfer task
+    tasks: Set[Tuple[int, int, asyncio.Task[Any]]]
 
     async def on_load(self) -> None:
         self.tasks = set()
@@ -91,21 +100,31 @@ class Network(module.Module):
         if ctx.msg.reply_to_message and ctx.input:
             return "__Can't pass GID/Message Id while replying to message.__"
 
-        reply_msg = ctx.msg.reply_to_message
-
-        for msg_id, task in list(self.tasks.copy()):
-            if reply_msg and reply_msg.id == msg_id or ctx.input == int(msg_id):
+        if ctx.msg.reply_to_message:
+            target = ctx.msg.reply_to_message.id
+        else:
+            try:
+                target = int(ctx.input)
+            except ValueError:
+                return "__Invalid message ID.__"
+
+        # The progress message aborts the whole command, a media message only its file
+        aborted = False
+        for cmd_msg_id, media_msg_id, task in list(self.tasks):
+            if target in (cmd_msg_id, media_msg_id):
                 task.cancel()
-                self.tasks.remove((msg_id, task))
-                break
-            else:
-                return "__The message you choose is not in task.__"
+                self.tasks.discard((cmd_msg_id, media_msg_id, task))
+                aborted = True
+
+        if not aborted:
+            return "__The message you choose is not in task.__"
 
         await ctx.msg.delete()
 
     @command.desc("Download file from telegram server")
     @command.alias("dl")
     @command.usage("[message media to download]", reply=True)
+    @command.concurrency(2)
     async def cmd_download(self, ctx: command.Context) -> str:
         if not ctx.msg.reply_to_message:
             return "__Reply to message with media to download.__"
@@ -127,39 +146,76 @@ class Network(module.Module):
             media_group = []
             media_group.append(reply_msg)
 
-        results = set()
-        for msg in media_group:
-            media = getattr(msg, msg.media.value)
+        if len(media_group) == 1:
+            media = getattr(reply_msg, reply_msg.media.value)
             try:
                 name = media.file_name
             except AttributeError:
-                name = f"{msg.media.value}_{(media.date or datetime.now()).strftime('%Y-%m-%d_%H-%M-%S')}"
-
-            task = self.bot.loop.create_task(
-                self.bot.client.download_media(
-                    msg,
-                    progress=prog_func,
-                    progress_args=(
-                        start_time,
-                        "download",
-                        ctx,
-                        name,
-                    ),
+                name = f"{reply_msg.media.value}_{(media.date or datetime.now()).strftime('%Y-%m-%d_%H-%M-%S')}"
+        else:
+            name = f"{len(media_group)} files"
+
+        # Progress of every file, reported as a whole
+        progress = {
+            msg.id: (0, getattr(msg, msg.media.value).file_size or 0)
+            for msg in media_group
+        }
+
+        report_lock = asyncio.Lock()
+
+        async def report(current: int, total: int, msg_id: int) -> None:
+            progress[msg_id] = (current, total)
+            # Files report concurrently, the shared progress is updated by one at a
+            # time with the latest sums
+            async with report_lock:
+                await prog_func(
+                    sum(current for current, _ in progress.values()),
+                    sum(total for _, total in progress.values()),
+                    start_time,
+                    "download",
+                    ctx,
+                    name,
+                )
+
+        semaphore = asyncio.Semaphore(
+            self.bot.config["bot"].get("download_concurrency", 3)
+        )
+
+        async def download(msg: Message) -> Any:
+            async with semaphore:
+                return await self.bot.download_media(
+                    msg, progress=report, progress_args=(msg.id,)
                 )
+
+        tasks = []
+        for msg in media_group:
+            task = self.bot.loop.create_task(download(msg))
+            self.tasks.add((ctx.msg.id, msg.id, task))
+            tasks.append((msg.id, task))
+
+        try:
+            results = await asyncio.gather(
+                *(task for _, task in tasks), return_exceptions=True
             )
-            self.tasks.add((ctx.msg.id, task))
-            try:
-                await task
-            except asyncio.CancelledError:
-                return "__Transmission aborted.__"
-            else:
-                self.tasks.remove((ctx.msg.id, task))
-                results.add((msg.id, task.result()))
+        finally:
+            for msg_id, task in tasks:
+                self.tasks.discard((ctx.msg.id, msg_id, task))
+
+        if all(isinstance(result, asyncio.CancelledError) for result in results):
+            return "__Transmission aborted.__"
 
         path = ""
-        for msg_id, result in results:
+        for (msg_id, _), result in zip(tasks, results):
+            if isinstance(result, asyncio.CancelledError):
+                path += f"\n× __Aborted media({msg_id}).__"
+                continue
+
+            if isinstance(result, Exception):
+                self.log.error("Failed to download media(%d)", msg_id, exc_info=result)
+                result = None
+
             if not result:
-                path += f"__Failed to download media({msg_id}).__"
+                path += f"\n× __Failed to download media({msg_id}).__"
                 continue
 
             if isinstance(result, str):
@@ -169,30 +225,80 @@ class Network(module.Module):
             else:
                 path += f"\n× `{self.bot.client.workdir}/downloads/{result.name}`"
 
-        if not path:
-            return "__Failed to download media.__"
-
         return f"Downloaded to:\n{path}"
 
+    async def upload_url(self, ctx: command.Context, url: str, start_time: int) -> None:
+        async with self.bot.http.get(url) as resp:
+            resp.raise_for_status()
+
+            name = (
+                os.path.basename(
+                    (resp.content_disposition and resp.content_disposition.filename)
+                    or unquote(urlparse(url).path)
+                )
+                or "download"
+            )
+            # Compressed responses are decoded on the fly, their length doesn't match
+            size = None if resp.headers.get("Content-Encoding") else resp.content_length
+            await util.transfer.send_stream(
+                self.bot.client,
+                ctx.msg.chat.id,
+                resp.content.iter_chunked(util.transfer.PART_SIZE),
+                name,
+                size=size,
+                message_thread_id=ctx.msg.message_thread_id,
+                progress=prog_func,
+                progress_args=(start_time, "upload", ctx, name),
+            )
+
+    async def upload_command(
+        self, ctx: command.Context, name: str, cmdline: str, start_time: int
+    ) -> Optional[int]:
+        output = await util.system.stream_command(
+            cmdline,
+            shell=True,  # skipcq: BAN-B604
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        await util.transfer.send_stream(
+            self.bot.client,
+            ctx.msg.chat.id,
+            output,
+            name,
+            message_thread_id=ctx.msg.message_thread_id,
+            progress=prog_func,
+            progress_args=(start_time, "upload", ctx, name),
+        )
+        return output.returncode
+
     @command.desc("Upload file into telegram server")
     @command.alias("ul")
-    @command.usage("[file path]")
+    @command.usage("[file path, URL or -c <file name> <shell command>]")
+    @command.concurrency(2)
     async def cmd_upload(self, ctx: command.Context) -> Optional[str]:
         if not ctx.input:
             return "__Pass the file path.__"
 
         start_time = util.time.sec()
-        file_path = AsyncPath(ctx.input)
 
-        if await file_path.is_dir():
-            return "__The path you input is a directory.__"
+        # Remote content and command output are streamed straight to Telegram
+        if re.match(r"https?://", ctx.input):
+            upload = self.upload_url(ctx, ctx.input, start_time)
+        elif ctx.args[0] == "-c":
+            if len(ctx.args) < 3:
+                return "__Pass the file name followed by the command.__"
 
-        if not await file_path.is_file():
-            return "__The file you input doesn't exists.__"
+            name, cmdline = ctx.input.split(maxsplit=2)[1:]
+            upload = self.upload_command(ctx, name, cmdline, start_time)
+        else:
+            file_path = AsyncPath(ctx.input)
 
-        await ctx.respond("Preparing to upload...")
-        task = self.bot.loop.create_task(
-            self.bot.client.send_document(
+            if await file_path.is_dir():
+                return "__The path you input is a directory.__"
+
+            if not await file_path.is_file():
+                return "__The file you input doesn't exists.__"
+
+            upload = self.bot.client.send_document(
                 ctx.msg.chat.id,
                 str(file_path),
                 message_thread_id=ctx.msg.message_thread_id,
@@ -205,13 +311,23 @@ class Network(module.Module):
                     file_path.name,
                 ),
             )
-        )
-        self.tasks.add((ctx.msg.id, task))
+
+        await ctx.respond("Preparing to upload...")
+        task = self.bot.loop.create_task(upload)
+        self.tasks.add((ctx.msg.id, ctx.msg.id, task))
         try:
-            await task
+            result = await task
         except asyncio.CancelledError:
             return "__Transmission aborted.__"
-        else:
-            self.tasks.remove((ctx.msg.id, task))
+        except aiohttp.ClientError as e:
+            return f"__Failed to fetch the URL:__ `{e}`"
+        except ValueError as e:
+            return f"__Failed to upload:__ `{e}`"
+        finally:
+            self.tasks.discard((ctx.msg.id, ctx.msg.id, task))
+
+        # Exit code of the command, its output was still uploaded
+        if isinstance(result, int) and result != 0:
+            return f"__Command exited with code {result}.__"
 
         await ctx.msg.delete()
@@ -1,5 +1,9 @@
-from typing import Any, ClassVar, Optional
+import asyncio
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, ClassVar, Dict, MutableMapping, Optional, Tuple
 
+from pymongo import UpdateOne
 from pyrogram.types import Message
 
 from caligo import command, module, util
@@ -8,6 +12,25 @@ from caligo.core import database
 USEC_PER_HOUR = 60 * 60 * 1000000
 USEC_PER_DAY = USEC_PER_HOUR * 24
 
+SEC_PER_MINUTE = 60
+SEC_PER_HOUR = SEC_PER_MINUTE * 60
+SEC_PER_DAY = SEC_PER_HOUR * 24
+
+# Views of the time-bucketed stats: bucket resolution, number of buckets,
+# rate unit and time format of the peak
+SERIES_PERIODS = {
+    "hour": (SEC_PER_MINUTE, 60, "min", "%H:%M"),
+    "day": (SEC_PER_HOUR, 24, "h", "%H:00"),
+    "week": (SEC_PER_HOUR, 24 * 7, "h", "%a %H:00"),
+}
+# Stats shown by the time-bucketed views, in display order
+SERIES_NAMES = {
+    "received": "Messages received",
+    "sent": "Messages sent",
+    "processed": "Commands processed",
+    "stickers_created": "Stickers created",
+}
+
 
 def _calc_pct(num1: int, num2: int) -> str:
     if not num2:
@@ -27,14 +50,145 @@ def _calc_pd(stat: int, uptime: int) -> str:
     return "{:.1f}".format(stat / up_day).rstrip("0").rstrip(".")  # skipcq: PYL-C0209
 
 
+def _peak(buckets: MutableMapping[int, int]) -> Optional[Tuple[int, int]]:
+    if not buckets:
+        return None
+
+    return max(buckets.items(), key=lambda item: (item[1], item[0]))
+
+
+def _format_time(timestamp: int, fmt: str) -> str:
+    return datetime.fromtimestamp(timestamp).strftime(fmt)
+
+
+class StatsSeries:
+    """Time-bucketed stat counters
+
+    Counts are kept per minute in memory and written on :meth:`flush` into two
+    kinds of bucket documents: one per hour holding per-minute counters and one
+    per day holding per-hour counters. Each flush is a single bulk write of
+    merged $inc, whatever the number of events. Old buckets are dropped by a
+    TTL index on ``expire_at``.
+    """
+
+    # How long buckets are kept after they end
+    HOUR_RETENTION: ClassVar[int] = 2 * SEC_PER_DAY
+    DAY_RETENTION: ClassVar[int] = 35 * SEC_PER_DAY
+
+    db: database.AsyncCollection
+    pending: Counter[Tuple[str, int]]
+
+    def __init__(self, db: database.AsyncCollection) -> None:
+        self.db = db
+        self.pending = Counter()
+
+    async def open(self) -> None:
+        await self.db.create_index("expire_at", expireAfterSeconds=0)
+
+    def add(self, key: str, value: int = 1) -> None:
+        now = util.time.sec()
+        self.pending[key, now - now % SEC_PER_MINUTE] += value
+
+    async def flush(self) -> None:
+        if not self.pending:
+            return
+
+        pending, self.pending = self.pending, Counter()
+
+        incs: Dict[str, Counter[str]] = {}
+        expiry: Dict[str, datetime] = {}
+        for (key, minute), value in pending.items():
+            for span, resolution, retention in (
+                (SEC_PER_HOUR, SEC_PER_MINUTE, self.HOUR_RETENTION),
+                (SEC_PER_DAY, SEC_PER_HOUR, self.DAY_RETENTION),
+            ):
+                start = minute - minute % span
+                doc_id = f"{span}:{start}"
+                idx = (minute - start) // resolution
+
+                incs.setdefault(doc_id, Counter())[f"counts.{key}.{idx}"] += value
+                expiry[doc_id] = datetime.fromtimestamp(
+                    start + span + retention, timezone.utc
+                )
+
+        try:
+            await self.db.bulk_write(
+                [
+                    UpdateOne(
+                        {"_id": doc_id},
+                        {
+                            "$inc": dict(inc),
+                            "$setOnInsert": {"expire_at": expiry[doc_id]},
+                        },
+                        upsert=True,
+                    )
+                    for doc_id, inc in incs.items()
+                ],
+                ordered=False,
+            )
+        except Exception:
+            self.pending.update(pending)
+            raise
+
+    async def query(self, resolution: int, count: int) -> Dict[str, Dict[int, int]]:
+        """Returns the non-zero counts of the last ``count`` buckets of each stat.
+
+        ``resolution`` is either :data:`SEC_PER_MINUTE`, read from the hourly
+        documents, or :data:`SEC_PER_HOUR`, read from the daily ones. Counts are
+        keyed by the start time of their bucket and include unflushed events.
+        """
+
+        span = SEC_PER_HOUR if resolution == SEC_PER_MINUTE else SEC_PER_DAY
+        now = util.time.sec()
+        end = now - now % resolution + resolution
+        begin = end - count * resolution
+
+        result: Dict[str, Dict[int, int]] = {}
+
+        def add(key: str, timestamp: int, value: int) -> None:
+            if begin <= timestamp < end and value:
+                buckets = result.setdefault(key, {})
+                buckets[timestamp] = buckets.get(timestamp, 0) + value
+
+        doc_ids = [
+            f"{span}:{start}" for start in range(begin - begin % span, end, span)
+        ]
+        async for doc in self.db.find({"_id": {"$in": doc_ids}}):
+            start = int(doc["_id"].split(":")[1])
+            for key, counts in doc.get("counts", {}).items():
+                for idx, value in counts.items():
+                    add(key, start + int(idx) * resolution, value)
+
+        for (key, minute), value in self.pending.items():
+            add(key, minute - minute % resolution, value)
+
+        return result
+
+    async def clear(self) -> None:
+        self.pending.clear()
+        await self.db.delete_many({})
+
+
 class Stats(module.Module):
     name: ClassVar[str] = "Stats"
 
     db: database.AsyncCollection
+    flush_interval: float
+    flush_lock: asyncio.Lock
+    flush_task: Optional[asyncio.Task[None]]
+    pending: Counter[str]
+    series: StatsSeries
 
     async def get(self, key: str) -> Optional[Any]:
         collection = await self.db.find_one({"_id": 0})
-        return collection.get(key) if collection else None
+        value = collection.get(key) if collection else None
+
+        # Add up the counts that haven't been written yet
+        pending = self.pending.get(key)
+        if pending:
+            value = (value or 0) + pending
+
+        return value
 
     async def inc(self, key: str, value: int) -> None:
         await self.db.find_one_and_update(
@@ -49,8 +203,42 @@ class Stats(module.Module):
             {"_id": 0}, {"$set": {key: value}}, upsert=True
         )
 
+    async def flush(self) -> None:
+        """Writes the counters gathered in memory with merged $inc."""
+
+        async with self.flush_lock:
+            if self.pending:
+                pending, self.pending = self.pending, Counter()
+                try:
+                    await self.db.update_one(
+                        {"_id": 0}, {"$inc": dict(pending)}, upsert=True
+                    )
+                except Exception:
+                    # Put them back so the next flush retries
+                    self.pending.update(pending)
+                    raise
+
+            await self.series.flush()
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+
+            try:
+                await self.flush()
+            except Exception as e:  # skipcq: PYL-W0703
+                self.log.warning("Failed to write stats into database", exc_info=e)
+
     async def on_load(self) -> None:
-        self.db = self.bot.db.get_collection(self.name.upper())
+        self.db = self.bot.db.cached(self.name.upper())
+        self.flush_interval = self.bot.config["bot"].get("stats_flush_interval", 60)
+        self.flush_lock = asyncio.Lock()
+        self.flush_task = None
+        self.pending = Counter()
+        self.series = StatsSeries(
+            self.bot.db.get_collection(self.name.upper() + "_SERIES")
+        )
+        await self.series.open()
 
         if await self.get("stop_time_usec") or await self.get("uptime"):
             self.log.info("Migrating stats timekeeping format")
@@ -70,6 +258,16 @@ class Stats(module.Module):
         if not await self.db.find_one({"_id": 0}):
             await self.inc("start_time_usec", time_us)
 
+        if self.flush_task is None:
+            self.flush_task = self.bot.loop.create_task(self._flush_loop())
+
+    async def on_stop(self) -> None:
+        if self.flush_task is not None:
+            self.flush_task.cancel()
+            self.flush_task = None
+
+        await self.flush()
+
     async def on_message(self, msg: Message) -> None:
         stat = "sent" if msg.outgoing else "received"
         await self.bot.log_stat(stat)
@@ -86,18 +284,85 @@ class Stats(module.Module):
         await self.bot.log_stat("processed")
 
     async def on_stat_event(self, key: str) -> None:
-        await self.inc(key, 1)
+        self.pending[key] += 1
+        self.series.add(key)
 
     async def get_start_time(self) -> int:
         return await self.get("start_time_usec") or self.bot.start_time_us
 
-    @command.desc("Show chat stats (pass `reset` to reset stats)")
-    @command.usage('["reset" to reset stats?]', optional=True)
+    async def format_series(self, period: str) -> str:
+        resolution, count, unit, time_fmt = SERIES_PERIODS[period]
+        data = await self.series.query(resolution, count)
+
+        stats = {}
+        for key, name in SERIES_NAMES.items():
+            buckets = data.get(key, {})
+            peak = _peak(buckets)
+            if peak is None:
+                stats[name] = "0"
+                continue
+
+            stat = f"{sum(buckets.values())} • peak {peak[1]}/{unit} at {_format_time(peak[0], time_fmt)}"
+            if period == "week":
+                days: Counter[str] = Counter()
+                for timestamp, value in buckets.items():
+                    days[_format_time(timestamp, "%a %d %b")] += value
+
+                day, value = days.most_common(1)[0]
+                stat += f" • busiest day {day} ({value})"
+
+            stats[name] = stat
+
+        return util.text.join_map(stats, heading=f"Stats for the last {period}")
+
+    def format_limits(self) -> str:
+        stats = {}
+        for name, cmd in self.bot.commands.items():
+            limiter = cmd.concurrency
+            if name != cmd.name or limiter is None:
+                continue
+
+            stat = (
+                f"{limiter.running}/{limiter.limit} running per {limiter.per}"
+                f" • {limiter.queued} queued (max {limiter.max_queued})"
+            )
+            if limiter.waited:
+                avg_wait = limiter.wait_time / limiter.waited
+                stat += (
+                    f" • waited {limiter.waited} times, avg {avg_wait:.1f}s,"
+                    f" max {limiter.max_wait_time:.1f}s"
+                )
+            if limiter.rejected:
+                stat += f" • {limiter.rejected} rejected"
+
+            stats[name] = stat
+
+        if not stats:
+            return "__No command has a concurrency limit.__"
+
+        return util.text.join_map(stats, heading="Command concurrency")
+
+    @command.desc(
+        "Show chat stats (pass `hour`, `day`, `week` or `limits` for details)"
+    )
+    @command.usage(
+        '["hour"/"day"/"week"/"limits" or "reset" to reset stats?]', optional=True
+    )
     @command.alias("stat")
     async def cmd_stats(self, ctx: command.Context) -> str:
+        if ctx.input in SERIES_PERIODS:
+            return await self.format_series(ctx.input)
+
+        if ctx.input == "limits":
+            return self.format_limits()
+
         if ctx.input == "reset":
-            await self.db.find_one_and_delete({"_id": 0})
-            await self.on_load()
+            # Wait for a flush in progress, or its $inc lands after the delete
+            async with self.flush_lock:
+                self.pending.clear()
+                await self.series.clear()
+                await self.db.find_one_and_delete({"_id": 0})
+
             await self.on_start(util.time.usec())
             return "__All stats have been reset.__"
 
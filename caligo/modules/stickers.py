@@ -1,8 +1,12 @@
 import asyncio
 import io
 import json
+import multiprocessing
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from typing import BinaryIO, ClassVar, Tuple, Union
+from typing import BinaryIO, ClassVar, Optional, Tuple, Union
 
 from aiopath import AsyncPath
 from PIL import Image
@@ -22,69 +26,125 @@ CACHE_PATH = "caligo/.cache/stickers"
 STICKER_BOT_USERNAME = "Stickers"
 
 
-async def resize_media(media: AsyncPath, video: bool) -> AsyncPath:
-    if video:
-        stdout, _, __ = await util.system.run_command(
-            "ffprobe",
-            "-v",
-            "error",
-            "-select_streams",
-            "v",
-            "-show_entries",
-            "stream=width,height",
-            "-of",
-            "json",
-            str(media),
-        )
-        metadata = json.loads(stdout)
-        width = round(metadata["streams"][0].get("width", 512))
-        height = round(metadata["streams"][0].get("height", 512))
-
-        if height == width:
-            height, width = 512, 512
-        elif height > width:
-            height, width = 512, -1
-        elif width > height:
-            height, width = -1, 512
-
-        resized_video = f"{CACHE_PATH}/{media.stem}.webm"
-        await util.system.run_command(
-            "ffmpeg",
-            "-i",
-            str(media),
-            "-ss",
-            "00:00:00",
-            "-to",
-            "00:00:03",
-            "-map",
-            "0:v",
-            "-b",
-            "256k",
-            "-fs",
-            "262144",
-            "-c:v",
-            "libvpx-vp9",
-            "-vf",
-            f"scale={width}:{height},fps=30",
-            resized_video,
-            "-y",
+def _resize_image(data: bytes, size: int, fmt: str) -> bytes:
+    """Scales an encoded image to fit in ``size`` pixels, runs in a worker process."""
+
+    with Image.open(io.BytesIO(data)) as image:
+        scale = size / max(image.width, image.height)
+        image = image.resize(
+            (int(image.width * scale), int(image.height * scale)), Image.LANCZOS
         )
-        await media.unlink()
-        return AsyncPath(resized_video)
-
-    image: Image.Image = await util.run_sync(Image.open, str(media))
-    scale = MAX_SIZE / max(image.width, image.height)
-    image = await util.run_sync(
-        image.resize,
-        (int(image.width * scale), int(image.height * scale)),
-        Image.LANCZOS,
-    )
 
-    resized_photo = f"{CACHE_PATH}/sticker.png"
-    await util.run_sync(image.save, resized_photo, "PNG")
+    buf = io.BytesIO()
+    image.save(buf, fmt)
+    return buf.getvalue()
+
+
+class ImageQueueFull(Exception):
+    pass
+
+
+class ImageWorker:
+    """Resizes sticker images in a pool of processes
+
+    PIL holds the GIL for most of a resize, so doing it in threads stalls the
+    event loop. At most ``workers`` images are processed at once and up to
+    ``queue_size`` more wait for their turn, further ones are turned down with
+    :obj:`ImageQueueFull`.
+    """
+
+    workers: int
+    queue_size: int
+    waiting: int
+
+    def __init__(self, workers: int, queue_size: int) -> None:
+        self.workers = max(workers, 1)
+        self.queue_size = queue_size
+        self.waiting = 0
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._semaphore = asyncio.Semaphore(self.workers)
+
+    async def resize(self, data: bytes, fmt: str = "PNG") -> bytes:
+        if self.waiting >= self.workers + self.queue_size:
+            raise ImageQueueFull()
+
+        self.waiting += 1
+        try:
+            async with self._semaphore:
+                # Processes are only spawned once the first sticker needs them.
+                # By then the database and client threads are running, and forking
+                # a threaded process can deadlock the child.
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(
+                        self.workers,
+                        mp_context=multiprocessing.get_context("forkserver"),
+                    )
+
+                return await asyncio.get_running_loop().run_in_executor(
+                    self._executor, _resize_image, data, MAX_SIZE, fmt
+                )
+        finally:
+            self.waiting -= 1
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+async def resize_video(media: AsyncPath, scratch: AsyncPath) -> Optional[io.BytesIO]:
+    stdout, _, __ = await util.system.run_command(
+        "ffprobe",
+        "-v",
+        "error",
+        "-select_streams",
+        "v",
+        "-show_entries",
+        "stream=width,height",
+        "-of",
+        "json",
+        str(media),
+    )
+    metadata = json.loads(stdout)
+    width = round(metadata["streams"][0].get("width", 512))
+    height = round(metadata["streams"][0].get("height", 512))
+
+    if height == width:
+        height, width = 512, 512
+    elif height > width:
+        height, width = 512, -1
+    elif width > height:
+        height, width = -1, 512
+
+    resized_video = scratch / f"{media.stem}.webm"
+    await util.system.run_command(
+        "ffmpeg",
+        "-i",
+        str(media),
+        "-ss",
+        "00:00:00",
+        "-to",
+        "00:00:03",
+        "-map",
+        "0:v",
+        "-b",
+        "256k",
+        "-fs",
+        "262144",
+        "-c:v",
+        "libvpx-vp9",
+        "-vf",
+        f"scale={width}:{height},fps=30",
+        str(resized_video),
+        "-y",
+    )
+    if not await resized_video.exists():
+        return None
 
-    await media.unlink()
-    return AsyncPath(resized_photo)
+    sticker = io.BytesIO(await resized_video.read_bytes())
+    sticker.name = resized_video.name
+    return sticker
 
 
 class LengthMismatchError(Exception):
@@ -95,14 +155,25 @@ class Sticker(module.Module):
     name: ClassVar[str] = "Sticker"
 
     db: database.AsyncCollection
+    images: ImageWorker
+    pack_lock: asyncio.Lock
 
     async def on_load(self):
         # to use later maybe
         self.db = self.bot.db.get_collection(self.name.upper())
+        self.images = ImageWorker(
+            self.bot.config["bot"].get("sticker_workers", 2),
+            self.bot.config["bot"].get("sticker_queue_size", 8),
+        )
+        # @Stickers only talks to one conversation at a time
+        self.pack_lock = asyncio.Lock()
 
         if not await AsyncPath(CACHE_PATH).exists():
             await AsyncPath(CACHE_PATH).mkdir(parents=True)
 
+    async def on_stop(self) -> None:
+        self.images.close()
+
     async def add_sticker(
         self,
         sticker_data: Union[str, BinaryIO],
@@ -259,7 +330,7 @@ class Sticker(module.Module):
         if not reply_msg.media:
             return "__Ewww can't kang that.__"
 
-        await ctx.respond("__Preparing...__")
+        await ctx.progress.update("__Preparing...__")
 
         pack_VOL = 1
         animation = False
@@ -305,11 +376,6 @@ class Sticker(module.Module):
             else:
                 pack_VOL = int(arg)
 
-        media = await reply_msg.download()
-        if not media:
-            return "__Failed to download media.__"
-
-        media = AsyncPath(media)
         if user.username:
             set_name = f"{self.bot.user.username}_kangPack_VOL{pack_VOL}"
             set_title = f"@{self.bot.user.username}'s Kang Set VOL.{pack_VOL}"
@@ -317,9 +383,16 @@ class Sticker(module.Module):
             set_name = f"{str(self.bot.user.id)}_kangPack_VOL{pack_VOL}"
             set_title = f"{str(self.bot.user.id)}'s Kang Set VOL.{pack_VOL}"
 
-        if resize:
+        sticker_buf: Optional[BinaryIO]
+        if video and resize:
+            # FFmpeg works on files, every job gets its own scratch directory
+            scratch = AsyncPath(await util.run_sync(tempfile.mkdtemp, dir=CACHE_PATH))
             try:
-                media = await resize_media(media, video)
+                media = await self.bot.download_media(reply_msg, directory=scratch)
+                if not media:
+                    return "__Failed to download media.__"
+
+                sticker_buf = await resize_video(AsyncPath(media), scratch)
             except FileNotFoundError:
                 return (
                     "❌ [FFmpeg](https://github.com/FFmpeg/FFmpeg) "
@@ -328,9 +401,24 @@ class Sticker(module.Module):
                     "you can install FFmpeg by adding this buildpack:\n"
                     "[FFmpeg](https://github.com/jonathanong/heroku-buildpack-ffmpeg-latest)"
                 )
-            else:
-                if not await media.exists():
-                    return "__Failed to resize media.__"
+            finally:
+                await util.run_sync(shutil.rmtree, str(scratch), ignore_errors=True)
+
+            if not sticker_buf:
+                return "__Failed to resize media.__"
+        else:
+            sticker_buf = await self.bot.download_media(reply_msg, in_memory=True)
+            if not sticker_buf:
+                return "__Failed to download media.__"
+
+            if resize:
+                try:
+                    resized = await self.images.resize(sticker_buf.getvalue(), "PNG")
+                except ImageQueueFull:
+                    return "__Too many stickers are being resized, try again later.__"
+
+                sticker_buf = io.BytesIO(resized)
+                sticker_buf.name = "sticker.png"
 
         if animation:
             set_name += "_animation"
@@ -339,67 +427,73 @@ class Sticker(module.Module):
             set_name += "_video"
             set_title += " (Video)"
 
-        while True:
-            sticker: StickerSet
-            try:
-                sticker = await self.bot.client.invoke(
-                    GetStickerSet(
-                        stickerset=InputStickerSetShortName(short_name=set_name), hash=0  # type: ignore
+        # Packs are checked under the lock too, so concurrent kangs agree on
+        # which VOL to fill
+        async with self.pack_lock:
+            while True:
+                sticker: StickerSet
+                try:
+                    sticker = await self.bot.client.invoke(
+                        GetStickerSet(
+                            stickerset=InputStickerSetShortName(short_name=set_name), hash=0  # type: ignore
+                        )
                     )
+                except StickersetInvalid:
+                    sticker = None  # type: ignore
+                    break
+                else:
+                    lim = 120 if not (animation or video) else 50
+                    if sticker.set.count >= lim:  # type: ignore
+                        pack_VOL += 1
+                        if self.bot.user.username:
+                            set_name = (
+                                f"{self.bot.user.username}_kangPack_VOL{pack_VOL}"
+                            )
+                            set_title = (
+                                f"@{self.bot.user.username}'s Kang Set VOL.{pack_VOL}"
+                            )
+                        else:
+                            set_name = f"{str(self.bot.user.id)}_kangPack_VOL{pack_VOL}"
+                            set_title = (
+                                f"{str(self.bot.user.id)}'s Kang Set VOL.{pack_VOL}"
+                            )
+
+                        if animation:
+                            set_name += "_animation"
+                            set_title += " (Animated)"
+                        if video:
+                            set_name += "_video"
+                            set_title += " (Video)"
+
+                        await ctx.progress.update(
+                            f"Pack VOL {pack_VOL} is full, switching to next VOL..."
+                        )
+                        continue
+
+                    break
+
+            if not emoji:
+                emoji = "❓"
+
+            sticker_buf.seek(0)
+            if not sticker:
+                await ctx.progress.update("Creating sticker pack...")
+                status, result = await self.create_pack(
+                    sticker_buf,
+                    set_name,
+                    set_title,
+                    emoji=emoji,
+                    sticker_type="animated"
+                    if animation
+                    else "video"
+                    if video
+                    else "static",
                 )
-            except StickersetInvalid:
-                sticker = None  # type: ignore
-                break
             else:
-                lim = 120 if not (animation or video) else 50
-                if sticker.set.count >= lim:  # type: ignore
-                    pack_VOL += 1
-                    if self.bot.user.username:
-                        set_name = f"{self.bot.user.username}_kangPack_VOL{pack_VOL}"
-                        set_title = (
-                            f"@{self.bot.user.username}'s Kang Set VOL.{pack_VOL}"
-                        )
-                    else:
-                        set_name = f"{str(self.bot.user.id)}_kangPack_VOL{pack_VOL}"
-                        set_title = f"{str(self.bot.user.id)}'s Kang Set VOL.{pack_VOL}"
-
-                    if animation:
-                        set_name += "_animation"
-                        set_title += " (Animated)"
-                    if video:
-                        set_name += "_video"
-                        set_title += " (Video)"
-
-                    await ctx.respond(
-                        f"Pack VOL {pack_VOL} is full, switching to next VOL..."
-                    )
-                    continue
-
-                break
-
-        if not emoji:
-            emoji = "❓"
-
-        sticker_bytes = await media.read_bytes()
-        sticker_buf = io.BytesIO(sticker_bytes)
-        sticker_buf.seek(0)
-        sticker_buf.name = media.name
-        if not sticker:
-            await ctx.respond("Creating sticker pack...")
-            status, result = await self.create_pack(
-                sticker_buf,
-                set_name,
-                set_title,
-                emoji=emoji,
-                sticker_type="animated"
-                if animation
-                else "video"
-                if video
-                else "static",
-            )
-        else:
-            await ctx.respond("Copying sticker...")
-            status, result = await self.add_sticker(sticker_buf, set_name, emoji=emoji)
+                await ctx.progress.update("Copying sticker...")
+                status, result = await self.add_sticker(
+                    sticker_buf, set_name, emoji=emoji
+                )
 
         if status:
             await self.bot.log_stat("stickers_created")
@@ -1,8 +1,9 @@
 import asyncio
+import codecs
 import os
 import sys
 from html import escape
-from typing import Any, ClassVar, Mapping, Optional
+from typing import Any, AsyncIterator, ClassVar, Mapping, Optional
 
 import speedtest
 from aiopath import AsyncPath
@@ -12,6 +13,17 @@ from pyrogram.types import Message
 from caligo import command, module, util
 from caligo.core import database
 
+# Output larger than this is sent as a file, with only its end shown in the response
+SHELL_INLINE_LIMIT = 3072
+SHELL_TAIL_SIZE = 2048
+
+
+def _format_shell(snip: str, stdout: str, footer: str) -> str:
+    return f"""<b>Input</b>:
+<pre language="bash">{escape(snip)}</pre>
+<b>Output</b>:
+<pre language="bash">{escape(stdout)}</pre>{footer}"""
+
 
 class System(module.Module):
     name: ClassVar[str] = "System"
@@ -22,7 +34,7 @@ class System(module.Module):
     async def on_load(self):
         self.restart_pending = False
 
-        self.db = self.bot.db.get_collection(self.name.upper())
+        self.db = self.bot.db.cached(self.name.upper())
 
     async def on_start(self, time_us: int) -> None:  # skipcq: PYL-W0613
         # Update restart status message if applicable
@@ -107,6 +119,7 @@ class System(module.Module):
 
     @command.desc("Test Internet speed")
     @command.alias("stest")
+    @command.concurrency(1, wait=False)
     async def cmd_speedtest(self, ctx: command.Context) -> str:
         before = util.time.usec()
 
@@ -167,12 +180,15 @@ class System(module.Module):
         if not snip:
             return "Give me command to run."
 
-        await ctx.respond("Running snippet...")
+        await ctx.progress.update("Running snippet...")
         before = util.time.usec()
 
         try:
-            stdout, _, ret = await util.system.run_command(
-                snip, shell=True, timeout=120  # skipcq: BAN-B604
+            output = await util.system.stream_command(
+                snip,
+                shell=True,  # skipcq: BAN-B604
+                timeout=120,
+                tail_size=SHELL_TAIL_SIZE,
             )
         except FileNotFoundError as E:
             after = util.time.usec()
@@ -182,39 +198,63 @@ class System(module.Module):
 ⚠️ Error executing command:
 <pre language="bash">{escape(util.error.format_exception(E))}</pre>
 
-f"Time: {util.time.format_duration_us(after - before)}""",
-                parse_mode=ParseMode.HTML,
-            )
-            return
-        except asyncio.TimeoutError:
-            after = util.time.usec()
-            await ctx.respond(
-                f"""<b>Input</b>:
-<pre language="bash">{escape(snip)}</pre>
-<b>Output</b>:
-🕑 Snippet failed to finish within 2 minutes."""
-                f"Time: {util.time.format_duration_us(after - before)}",
+Time: {util.time.format_duration_us(after - before)}""",
                 parse_mode=ParseMode.HTML,
             )
             return
 
-        after = util.time.usec()
+        timed_out = False
 
-        el_us = after - before
-        el_str = f"\nTime: {util.time.format_duration_us(el_us)}"
+        async def read_output() -> AsyncIterator[str]:
+            nonlocal timed_out
+
+            decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+            try:
+                async for chunk in output:
+                    yield decoder.decode(chunk)
+                    await ctx.progress.update(
+                        _format_shell(
+                            snip,
+                            self.bot.redact_message(output.tail_text()),
+                            "🕑 Running...",
+                        ),
+                        parse_mode=ParseMode.HTML,
+                    )
+            except asyncio.TimeoutError:
+                timed_out = True
+
+            yield decoder.decode(b"", final=True)
+
+        # Keep the whole output around in case it's too long for a message
+        out_file = await util.tg.spool(self.bot.redact_lines(read_output()))
+        with out_file:
+            after = util.time.usec()
+            el_str = f"\nTime: {util.time.format_duration_us(after - before)}"
+            notes = []
+            if timed_out:
+                notes.append("🕑 Snippet failed to finish within 2 minutes.")
+            elif output.returncode != 0:
+                notes.append(f"⚠️ Return code: {output.returncode}")
+
+            if output.total > SHELL_INLINE_LIMIT:
+                # Too long for a message, upload everything and show the end of it
+                await util.tg.send_as_document(
+                    out_file, ctx.msg, snip, file_name="output.txt"
+                )
+                stdout = "..." + self.bot.redact_message(output.tail_text())
+                size = util.misc.human_readable_bytes(output.total)
+                notes.insert(0, f"📄 Full output ({size}) sent as a file.")
+            else:
+                # Short enough to still be held in memory
+                stdout = out_file.read().decode(errors="replace").strip()
 
         if not stdout:
             stdout = "[no output]"
         elif stdout[-1:] != "\n":
             stdout += "\n"
 
-        stdout = self.bot.redact_message(stdout)
-        err = f"⚠️ Return code: {ret}" if ret != 0 else ""
         await ctx.respond(
-            f"""<b>Input</b>:
-<pre language="bash">{escape(snip)}</pre>
-<b>Output</b>:
-<pre language="bash">{escape(stdout)}</pre>{err}{el_str}""",
+            _format_shell(snip, stdout, "\n".join(notes) + el_str),
             parse_mode=ParseMode.HTML,
         )
 
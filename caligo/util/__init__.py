@@ -1,4 +1,17 @@
 # skipcq: PY-W2000
-from . import async_helpers, error, git, misc, system, text, tg, time, version
+from . import (
+    async_helpers,
+    cache,
+    error,
+    file_cache,
+    git,
+    misc,
+    system,
+    text,
+    tg,
+    time,
+    transfer,
+    version,
+)
 
 run_sync = async_helpers.run_sync
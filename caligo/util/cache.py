@@ -0,0 +1,99 @@
+import time
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, Optional, Tuple, TypeVar
+
+Key = TypeVar("Key", bound=Hashable)
+Value = TypeVar("Value")
+
+
+class LRUCache(Generic[Key, Value]):
+    """Bounded mapping that evicts the least recently used entry first.
+
+    Entries optionally expire ``ttl`` seconds after they were last stored.
+    Lookups through :meth:`get` are counted in :attr:`hits` and :attr:`misses`.
+    ``on_evict`` is called with the key and value of every entry dropped because
+    the cache was full or the entry expired, but not for :meth:`pop` and
+    :meth:`clear`.
+    """
+
+    maxsize: int
+    ttl: Optional[float]
+    hits: int
+    misses: int
+    on_evict: Optional[Callable[[Key, Value], None]]
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: Optional[float] = None,
+        *,
+        on_evict: Optional[Callable[[Key, Value], None]] = None,
+    ) -> None:
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.on_evict = on_evict
+
+        self._data: "OrderedDict[Key, Tuple[float, Value]]" = OrderedDict()
+
+    def __contains__(self, key: Key) -> bool:
+        return self._lookup(key) is not None
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _lookup(self, key: Key) -> Optional[Tuple[float, Value]]:
+        try:
+            entry = self._data[key]
+        except KeyError:
+            return None
+
+        if self.ttl is not None and time.monotonic() - entry[0] > self.ttl:
+            del self._data[key]
+            if self.on_evict is not None:
+                self.on_evict(key, entry[1])
+
+            return None
+
+        return entry
+
+    def get(self, key: Optional[Key]) -> Optional[Value]:
+        """Returns the cached value for the key, or None if it's missing or expired."""
+
+        entry = self._lookup(key) if key is not None else None
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._data.move_to_end(key)  # type: ignore
+        return entry[1]
+
+    def put(self, key: Key, value: Value) -> None:
+        """Stores the value, evicting the least recently used entry if full."""
+
+        self._data[key] = (time.monotonic(), value)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.maxsize:
+            evicted, (_, evicted_value) = self._data.popitem(last=False)
+            if self.on_evict is not None:
+                self.on_evict(evicted, evicted_value)
+
+    def pop(self, key: Key) -> Optional[Value]:
+        """Removes the key and returns its value if it was cached."""
+
+        entry = self._data.pop(key, None)
+        return entry[1] if entry is not None else None
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
@@ -0,0 +1,222 @@
+import asyncio
+import json
+import os
+import shutil
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+from .async_helpers import run_sync
+
+# Cached file name and size in bytes
+Entry = Tuple[str, int]
+
+
+class FileCache:
+    """Content-addressed cache of downloaded Telegram files
+
+    Files are keyed by their ``file_unique_id``, which is the same for a given
+    file whatever chat or message it comes from. Cached files are copies of the
+    downloads, so editing a download never changes its cached file, and entries
+    whose size doesn't match the index anymore are dropped. The least recently
+    used files are evicted once the cache holds more than ``quota`` bytes. The
+    index is kept in a JSON file next to the files.
+    """
+
+    INDEX_NAME = "index.json"
+
+    path: Path
+    quota: int
+
+    def __init__(self, path: Union[str, Path], quota: int) -> None:
+        self.path = Path(path)
+        self.quota = quota
+
+        self._index: "OrderedDict[str, Entry]" = OrderedDict()
+        self._loaded = False
+        self._lock = asyncio.Lock()
+
+    @property
+    def size(self) -> int:
+        return sum(size for _, size in self._index.values())
+
+    @staticmethod
+    def _copy(src: Path, dest: Path) -> None:
+        tmp = dest.with_name(dest.name + ".tmp")
+        shutil.copy2(src, tmp)
+        os.replace(tmp, dest)
+
+    def _load(self) -> None:
+        self.path.mkdir(parents=True, exist_ok=True)
+        try:
+            with open(self.path / self.INDEX_NAME, encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            entries = []
+
+        # Stored from least to most recently used
+        for unique_id, name, size in entries:
+            if (self.path / name).is_file():
+                self._index[unique_id] = (name, size)
+
+        self._loaded = True
+
+    def _save(self) -> None:
+        index_path = self.path / self.INDEX_NAME
+        tmp = index_path.with_name(index_path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(
+                [[unique_id, *entry] for unique_id, entry in self._index.items()], f
+            )
+
+        os.replace(tmp, index_path)
+
+    def _evict(self) -> None:
+        size = self.size
+        while self._index and size > self.quota:
+            _, (name, entry_size) = self._index.popitem(last=False)
+            try:
+                os.unlink(self.path / name)
+            except FileNotFoundError:
+                pass
+
+            size -= entry_size
+
+    def _drop(self, unique_id: str) -> None:
+        name, _ = self._index.pop(unique_id)
+        try:
+            os.unlink(self.path / name)
+        except FileNotFoundError:
+            pass
+
+        self._save()
+
+    def _lookup(self, unique_id: str) -> Optional[Path]:
+        if not self._loaded:
+            self._load()
+
+        try:
+            name, size = self._index[unique_id]
+        except KeyError:
+            return None
+
+        path = self.path / name
+        try:
+            intact = path.stat().st_size == size
+        except FileNotFoundError:
+            intact = False
+
+        if not intact:
+            # Deleted or changed behind our back
+            self._drop(unique_id)
+            return None
+
+        return path
+
+    def _get(
+        self, unique_id: str, directory: Path, file_name: Optional[str]
+    ) -> Optional[str]:
+        path = self._lookup(unique_id)
+        if path is None:
+            return None
+
+        dest = directory / (file_name or path.name)
+        try:
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            self._copy(path, dest)
+        except FileNotFoundError:
+            self._drop(unique_id)
+            return None
+
+        self._index.move_to_end(unique_id)
+        return str(dest)
+
+    def _read(self, unique_id: str) -> Optional[bytes]:
+        path = self._lookup(unique_id)
+        if path is None:
+            return None
+
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            self._drop(unique_id)
+            return None
+
+        self._index.move_to_end(unique_id)
+        return data
+
+    def _add(self, unique_id: str, name: str, size: int) -> None:
+        self._index[unique_id] = (name, size)
+        self._index.move_to_end(unique_id)
+        self._evict()
+        self._save()
+
+    def _put(self, unique_id: str, path: Path) -> None:
+        if not self._loaded:
+            self._load()
+
+        name = unique_id + path.suffix
+        self._copy(path, self.path / name)
+        self._add(unique_id, name, (self.path / name).stat().st_size)
+
+    def _put_bytes(self, unique_id: str, suffix: str, data: bytes) -> None:
+        if not self._loaded:
+            self._load()
+
+        name = unique_id + suffix
+        tmp = self.path / (name + ".tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, self.path / name)
+        self._add(unique_id, name, len(data))
+
+    async def get(
+        self,
+        unique_id: str,
+        directory: Union[str, Path],
+        file_name: Optional[str] = None,
+    ) -> Optional[str]:
+        """Places the cached file into the directory and returns its new path.
+
+        The file keeps its name in the cache unless ``file_name`` is given.
+        Returns None if the file isn't cached.
+        """
+
+        if self.quota <= 0:
+            return None
+
+        async with self._lock:
+            return await run_sync(self._get, unique_id, Path(directory), file_name)
+
+    async def read(self, unique_id: str) -> Optional[bytes]:
+        """Returns the content of the cached file, or None if it isn't cached."""
+
+        if self.quota <= 0:
+            return None
+
+        async with self._lock:
+            return await run_sync(self._read, unique_id)
+
+    async def put(self, unique_id: str, path: Union[str, Path]) -> None:
+        """Adds a downloaded file into the cache."""
+
+        if self.quota <= 0:
+            return
+
+        async with self._lock:
+            await run_sync(self._put, unique_id, Path(path))
+
+    async def put_bytes(self, unique_id: str, suffix: str, data: bytes) -> None:
+        """Adds a file downloaded in memory into the cache."""
+
+        if self.quota <= 0:
+            return
+
+        async with self._lock:
+            await run_sync(self._put_bytes, unique_id, suffix, data)
+
+    async def close(self) -> None:
+        """Persists the recency order of the index."""
+
+        async with self._lock:
+            if self._loaded:
+                await run_sync(self._save)
@@ -1,6 +1,6 @@
 import asyncio
 import sys
-from typing import IO, Any, Optional, Sequence, Tuple, Union
+from typing import IO, Any, AsyncIterator, Optional, Sequence, Tuple, Union
 
 ProcessData = Union[str, bytes]
 ProcessStream = Union[int, IO, None]
@@ -89,3 +89,89 @@ async def run_command(*cmdline: ProcessData,
         proc = await _spawn_exec(cmdline, in_data, stdout, stderr, **kwargs)
 
     return await _get_proc_output(proc, in_data, timeout, text)
+
+
+class CommandStream:
+    """Output of a running command, read as it arrives
+
+    Iterating yields the output chunks as soon as the process writes them. Only
+    the last ``tail_size`` bytes are kept in :attr:`tail`, so memory stays bounded
+    whatever the size of the output. The process is killed if the timeout
+    expires or the iteration is abandoned.
+    """
+
+    CHUNK_SIZE = 64 * 1024
+
+    proc: asyncio.subprocess.Process
+    timeout: Optional[float]
+    tail: bytearray
+    tail_size: int
+    total: int
+
+    def __init__(self, proc: asyncio.subprocess.Process,
+                 timeout: Optional[float], tail_size: int) -> None:
+        self.proc = proc
+        self.timeout = timeout
+        self.tail = bytearray()
+        self.tail_size = tail_size
+        self.total = 0
+
+    @property
+    def returncode(self) -> Optional[int]:
+        return self.proc.returncode
+
+    def tail_text(self) -> str:
+        return self.tail.decode(errors="replace")
+
+    def _kill(self) -> None:
+        if self.proc.returncode is None:
+            try:
+                self.proc.kill()
+            except ProcessLookupError:
+                pass
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout if self.timeout else None
+
+        def remaining() -> Optional[float]:
+            return max(0, deadline - loop.time()) if deadline else None
+
+        try:
+            while True:
+                chunk = await asyncio.wait_for(
+                    self.proc.stdout.read(self.CHUNK_SIZE),  # type: ignore
+                    remaining())
+                if not chunk:
+                    break
+
+                self.total += len(chunk)
+                self.tail += chunk
+                # Drop the oldest bytes to keep the tail bounded
+                excess = len(self.tail) - self.tail_size
+                if excess > 0:
+                    del self.tail[:excess]
+
+                yield chunk
+
+            await asyncio.wait_for(self.proc.wait(), remaining())
+        except BaseException:
+            self._kill()
+            raise
+
+
+async def stream_command(*cmdline: ProcessData,
+                         stderr: ProcessStream = asyncio.subprocess.STDOUT,
+                         timeout: Optional[float] = None,
+                         shell: bool = False,
+                         tail_size: int = 4096,
+                         **kwargs: Any) -> CommandStream:
+    """Starts the given command and returns a stream of its output, see :class:`CommandStream`."""
+
+    stdout = asyncio.subprocess.PIPE
+    if shell:
+        proc = await _spawn_shell(cmdline[0], None, stdout, stderr, **kwargs)
+    else:
+        proc = await _spawn_exec(cmdline, None, stdout, stderr, **kwargs)
+
+    return CommandStream(proc, timeout, tail_size)
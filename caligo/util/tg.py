@@ -1,12 +1,22 @@
 import io
+import shutil
+import tempfile
 import uuid
-from typing import Any
+from typing import IO, Any, AsyncIterable, AsyncIterator, Iterator, Optional, Union
 
 import bprint
 import pyrogram
 
+from .async_helpers import run_sync
+
 MESSAGE_CHAR_LIMIT = 4096
+CAPTION_CHAR_LIMIT = 1024
 TRUNCATION_SUFFIX = "... (truncated)"
+PAGE_ELLIPSIS = "..."
+# Documents bigger than this are spooled to disk instead of memory
+SPOOL_MAX_SIZE = 8 * 1024 * 1024
+# Characters of text encoded at a time when spooling it
+SPOOL_TEXT_CHUNK = 64 * 1024
 
 SKIP_ATTR_NAMES = (
     "CONSTRUCTOR_ID",
@@ -67,6 +77,98 @@ def pretty_print_entity(entity: Any) -> str:
     return bprint.bprint(entity, stream=str, skip_predicate=_bprint_skip_predicate)
 
 
+def utf16_len(text: str) -> int:
+    """Returns the length of the given text in UTF-16 code units, as Telegram counts it."""
+
+    return len(text.encode("utf-16-le")) // 2
+
+
+def _page_end(text: str, start: int, limit: int) -> int:
+    """Returns the end offset of the longest page starting at the offset that fits the limit.
+
+    Pages end after a line break when there is one in their second half.
+    """
+
+    end = min(len(text), start + limit)
+    # Characters outside the BMP take two units, each dropped character removes
+    # at most two units of the excess
+    excess = utf16_len(text[start:end]) - limit
+    while excess > 0:
+        end -= (excess + 1) // 2
+        excess = utf16_len(text[start:end]) - limit
+
+    if end < len(text):
+        newline = text.rfind("\n", start + (end - start) // 2, end)
+        if newline != -1:
+            end = newline + 1
+
+    return max(end, start + 1)
+
+
+def _split_pages(
+    text: str, max_pages: int, limit: int, continued: bool
+) -> Iterator[str]:
+    start = 0
+    pages = 0
+    while start < len(text) and pages < max_pages:
+        prefix = PAGE_ELLIPSIS if pages or continued else ""
+        pages += 1
+
+        if pages == max_pages:
+            # The last page takes the rest, the response falls back to a document
+            # if it doesn't fit
+            yield prefix + text[start:]
+            return
+
+        end = _page_end(text, start, limit - len(prefix))
+        if end < len(text):
+            end = _page_end(text, start, limit - len(prefix) - len(PAGE_ELLIPSIS))
+            yield prefix + text[start:end] + PAGE_ELLIPSIS
+        else:
+            yield prefix + text[start:end]
+
+        start = end
+
+
+def split_pages(
+    text: str, max_pages: int, limit: int = MESSAGE_CHAR_LIMIT
+) -> Iterator[str]:
+    """Splits the given text into message pages, marked with ellipses where they continue.
+
+    The text is walked once by offsets, every page but the last one fits in
+    ``limit`` UTF-16 code units. The last page holds whatever remains.
+    """
+
+    return _split_pages(text, max_pages, limit, False)
+
+
+async def split_pages_stream(
+    chunks: AsyncIterable[str], max_pages: int, limit: int = MESSAGE_CHAR_LIMIT
+) -> AsyncIterator[str]:
+    """Same as :func:`split_pages`, for text produced in chunks.
+
+    Pages are yielded as soon as enough text came in, only about a page worth of
+    text is buffered until the last page.
+    """
+
+    buf = ""
+    pages = 0
+    async for chunk in chunks:
+        buf += chunk
+
+        # There's more text after the page, so it gets the trailing ellipsis
+        while pages < max_pages - 1 and utf16_len(buf) > limit:
+            prefix = PAGE_ELLIPSIS if pages else ""
+            end = _page_end(buf, 0, limit - len(prefix) - len(PAGE_ELLIPSIS))
+            yield prefix + buf[:end] + PAGE_ELLIPSIS
+
+            buf = buf[end:]
+            pages += 1
+
+    for page in _split_pages(buf, max_pages - pages, limit, pages > 0):
+        yield page
+
+
 def truncate(text: str) -> str:
     """Truncates the given text to fit in one Telegram message."""
     suffix = TRUNCATION_SUFFIX
@@ -79,12 +181,103 @@ def truncate(text: str) -> str:
     return text
 
 
+def _roll_over(buf: IO[bytes]) -> IO[bytes]:
+    """Moves the content of the in-memory spool into a temporary file on disk."""
+
+    file = tempfile.TemporaryFile()
+    try:
+        buf.seek(0)
+        shutil.copyfileobj(buf, file)
+    except BaseException:
+        file.close()
+        raise
+
+    buf.close()
+    return file
+
+
+async def spool(chunks: AsyncIterable[Union[str, bytes]]) -> IO[bytes]:
+    """Writes the chunks into a temporary file, kept in memory while it's small.
+
+    The content moves to a file on disk once it outgrows ``SPOOL_MAX_SIZE``,
+    which is written from a thread. Both are real binary file objects, that
+    Pyrogram can upload. The returned file is rewound and must be closed by the
+    caller.
+    """
+
+    file: IO[bytes] = io.BytesIO()
+    on_disk = False
+    try:
+        async for chunk in chunks:
+            data = chunk.encode() if isinstance(chunk, str) else chunk
+            if on_disk:
+                await run_sync(file.write, data)
+                continue
+
+            file.write(data)
+            if file.tell() > SPOOL_MAX_SIZE:
+                file = await run_sync(_roll_over, file)
+                on_disk = True
+    except BaseException:
+        file.close()
+        raise
+
+    file.seek(0)
+    return file
+
+
+async def _slice_text(text: str) -> AsyncIterator[str]:
+    for start in range(0, len(text), SPOOL_TEXT_CHUNK):
+        yield text[start : start + SPOOL_TEXT_CHUNK]
+
+
+async def spool_text(text: str) -> IO[bytes]:
+    """Encodes the text into a temporary file a slice at a time.
+
+    Avoids holding a second full copy of big texts in memory as bytes. The
+    returned file is rewound and must be closed by the caller.
+    """
+
+    return await spool(_slice_text(text))
+
+
 async def send_as_document(
-    content: str, msg: pyrogram.types.Message, caption: str
+    content: Union[str, bytes, IO[bytes], AsyncIterable[Union[str, bytes]]],
+    msg: pyrogram.types.Message,
+    caption: str,
+    *,
+    file_name: Optional[str] = None,
+    **kwargs: Any,
 ) -> pyrogram.types.Message:
-    with io.BytesIO(str.encode(content)) as o:
-        o.name = str(uuid.uuid4()).split("-")[0].upper() + ".TXT"
+    """Replies to the message with the content as a text document.
+
+    The content can also be a binary file, which is sent from its start and left
+    open, or an async iterable of chunks, which is spooled to a temporary file
+    so that it never has to be held in memory as a whole.
+    """
+
+    if file_name is None:
+        file_name = str(uuid.uuid4()).split("-")[0].upper() + ".TXT"
+
+    caption = "❯ ```" + caption + "```"
+    if len(caption) > CAPTION_CHAR_LIMIT:
+        caption = caption[: CAPTION_CHAR_LIMIT - len(TRUNCATION_SUFFIX) - 3]
+        caption += TRUNCATION_SUFFIX + "```"
+
+    document: IO[bytes]
+    if isinstance(content, str):
+        document = await spool_text(content)
+    elif isinstance(content, bytes):
+        document = io.BytesIO(content)
+    elif isinstance(content, AsyncIterable):
+        document = await spool(content)
+    else:
+        content.seek(0)
+        return await msg.reply_document(
+            document=content, file_name=file_name, caption=caption, **kwargs
+        )
+
+    with document:
         return await msg.reply_document(
-            document=o,
-            caption="❯ ```" + caption + "```",
+            document=document, file_name=file_name, caption=caption, **kwargs
         )
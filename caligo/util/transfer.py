@@ -0,0 +1,541 @@
+import asyncio
+import json
+import math
+import mimetypes
+import os
+import weakref
+from hashlib import md5
+from pathlib import Path
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+
+import pyrogram
+from pyrogram import raw, utils
+from pyrogram.errors import FloodWait
+from pyrogram.session import Session
+
+from .async_helpers import run_sync
+
+# Size of the chunks served by GetFile, as requested by Pyrogram
+CHUNK_SIZE = 1024 * 1024
+# Chunks asked for in one go, a dropped connection loses at most one of them
+SEGMENT_CHUNKS = 64
+# Attempts in a row that may come back empty before giving up
+MAX_RETRIES = 5
+# Finished chunks between writes of the sidecar, it's always written on exit
+SAVE_CHUNKS = 16
+
+# Size of every uploaded part but the last one
+PART_SIZE = 512 * 1024
+# Streams up to this size are sent as a small file, which is also as much as is
+# buffered before telling whether the stream is bigger
+BIG_FILE_SIZE = 10 * 1024 * 1024
+# Parts of a big file sent at the same time
+UPLOAD_WORKERS = 4
+
+DEFAULT_EXTENSIONS = {
+    "animation": ".mp4",
+    "audio": ".mp3",
+    "photo": ".jpg",
+    "sticker": ".webp",
+    "video": ".mp4",
+    "video_note": ".mp4",
+    "voice": ".ogg",
+}
+
+Progress = Callable[..., Awaitable[Any]]
+
+# Held while a partial file is being written, dropped once nobody uses it
+_download_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = (
+    weakref.WeakValueDictionary()
+)
+
+
+def media_file_name(message: pyrogram.types.Message) -> str:
+    """Returns the name a message media is saved under.
+
+    Media without a name of their own are named after their ``file_unique_id``,
+    so downloading the same media again ends up in the same file.
+    """
+
+    media = getattr(message, message.media.value)
+    name = os.path.basename(getattr(media, "file_name", None) or "")
+    if name and name not in (".", ".."):
+        return name
+
+    mime_type = getattr(media, "mime_type", None)
+    ext = (mimetypes.guess_extension(mime_type) if mime_type else None) or (
+        DEFAULT_EXTENSIONS.get(message.media.value, "")
+    )
+    return f"{message.media.value}_{media.file_unique_id}{ext}"
+
+
+class ResumableDownload:
+    """Downloads the media of a message chunk by chunk into a ``.part`` file
+
+    The partial file is named after the target and the ``file_unique_id``, so
+    different files saved under the same name never share it. Finished chunks
+    are recorded in a ``.part.json`` sidecar next to it, every few chunks and
+    when the download stops, so a download that got aborted or lost its
+    connection carries on from where it stopped the next time. With more than one worker, separate chunk ranges are
+    streamed from the file's DC in parallel.
+    """
+
+    client: pyrogram.Client
+    message: pyrogram.types.Message
+    path: Path
+    part_path: Path
+    workers: int
+
+    unique_id: str
+    size: int
+    chunks: int
+    done: Set[int]
+    current: int
+
+    def __init__(
+        self,
+        client: pyrogram.Client,
+        message: pyrogram.types.Message,
+        path: Union[str, Path],
+        *,
+        workers: int = 1,
+    ) -> None:
+        media = getattr(message, message.media.value)
+
+        self.client = client
+        self.message = message
+        self.path = Path(path)
+        self.workers = max(workers, 1)
+
+        self.unique_id = media.file_unique_id
+        self.size = media.file_size
+        self.chunks = math.ceil(self.size / CHUNK_SIZE)
+        self.done = set()
+        self.current = 0
+
+        part_name = f"{self.path.name}.{self.unique_id}.part"
+        self.part_path = self.path.with_name(part_name)
+        self._state_path = self.path.with_name(part_name + ".json")
+        self._fd: Optional[int] = None
+        self._save_lock = asyncio.Lock()
+        self._unsaved = 0
+
+    def _chunk_size(self, index: int) -> int:
+        return min(CHUNK_SIZE, self.size - index * CHUNK_SIZE)
+
+    def _open(self) -> None:
+        try:
+            with open(self._state_path, encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = {}
+
+        if (
+            state.get("file_unique_id") == self.unique_id
+            and state.get("size") == self.size
+            and self.part_path.is_file()
+        ):
+            for start, end in state.get("done", []):
+                self.done.update(range(start, end))
+
+            self.current = sum(self._chunk_size(index) for index in self.done)
+            self._fd = os.open(self.part_path, os.O_WRONLY)
+        else:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._fd = os.open(
+                self.part_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644
+            )
+
+    def _save(self, done: List[int]) -> None:
+        # Store finished chunks as [start, end) ranges to keep the sidecar small
+        ranges: List[List[int]] = []
+        for index in done:
+            if ranges and ranges[-1][1] == index:
+                ranges[-1][1] = index + 1
+            else:
+                ranges.append([index, index + 1])
+
+        tmp = self._state_path.with_name(self._state_path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(
+                {"file_unique_id": self.unique_id, "size": self.size, "done": ranges},
+                f,
+            )
+
+        os.replace(tmp, self._state_path)
+
+    def _write(self, index: int, data: bytes) -> None:
+        os.pwrite(self._fd, data, index * CHUNK_SIZE)  # type: ignore
+
+    def _close(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def _finish(self) -> None:
+        self._close()
+        os.replace(self.part_path, self.path)
+        os.unlink(self._state_path)
+
+    def _segments(self) -> List[Tuple[int, int]]:
+        """Returns the (start, count) chunk ranges left to fetch."""
+
+        segments = []
+        start = None
+        for index in range(self.chunks + 1):
+            if index < self.chunks and index not in self.done:
+                if start is None:
+                    start = index
+                if index - start + 1 < SEGMENT_CHUNKS:
+                    continue
+
+                segments.append((start, index - start + 1))
+                start = None
+            elif start is not None:
+                segments.append((start, index - start))
+                start = None
+
+        return segments
+
+    async def _save_state(self) -> None:
+        async with self._save_lock:
+            self._unsaved = 0
+            await run_sync(self._save, sorted(self.done))
+
+    async def _fetch(
+        self,
+        start: int,
+        count: int,
+        progress: Optional[Progress],
+        progress_args: Tuple[Any, ...],
+    ) -> int:
+        """Streams up to ``count`` chunks from ``start`` and returns how many came."""
+
+        index = start
+        async for chunk in self.client.stream_media(
+            self.message, limit=count, offset=start
+        ):
+            await run_sync(self._write, index, chunk)
+            if index not in self.done:
+                self.done.add(index)
+                self.current += len(chunk)
+                self._unsaved += 1
+
+            index += 1
+            if self._unsaved >= SAVE_CHUNKS:
+                await self._save_state()
+
+            if progress is not None:
+                await progress(self.current, self.size, *progress_args)
+
+        return index - start
+
+    async def _worker(
+        self,
+        segments: List[Tuple[int, int]],
+        progress: Optional[Progress],
+        progress_args: Tuple[Any, ...],
+    ) -> None:
+        while segments:
+            start, count = segments.pop()
+            retries = 0
+            while count > 0:
+                # Chunks that came in before a FloodWait aren't fetched again
+                while count > 0 and start in self.done:
+                    start += 1
+                    count -= 1
+                if count <= 0:
+                    break
+
+                try:
+                    fetched = await self._fetch(start, count, progress, progress_args)
+                except FloodWait as e:
+                    await asyncio.sleep(e.value)  # type: ignore
+                    continue
+
+                start += fetched
+                count -= fetched
+                if count <= 0:
+                    break
+
+                # Pyrogram ends the stream quietly when a request fails
+                retries = retries + 1 if not fetched else 0
+                if retries > MAX_RETRIES:
+                    raise ConnectionError(
+                        f"Failed to download chunk {start} of {self.path.name}"
+                    )
+
+                await asyncio.sleep(retries)
+                if not fetched:
+                    # The file reference may have expired
+                    message = await self.client.get_messages(
+                        self.message.chat.id, self.message.id
+                    )
+                    if message and message.media:
+                        self.message = message
+
+    async def run(
+        self,
+        *,
+        progress: Optional[Progress] = None,
+        progress_args: Tuple[Any, ...] = (),
+    ) -> str:
+        """Downloads the missing chunks and returns the path of the finished file."""
+
+        await run_sync(self._open)
+        try:
+            # Workers pop from the end, so fetch the file front to back
+            segments = self._segments()[::-1]
+            tasks = [
+                asyncio.create_task(self._worker(segments, progress, progress_args))
+                for _ in range(min(self.workers, len(segments)))
+            ]
+            try:
+                await asyncio.gather(*tasks)
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+
+                await asyncio.gather(*tasks, return_exceptions=True)
+                raise
+        finally:
+            try:
+                if self._unsaved and len(self.done) < self.chunks:
+                    await self._save_state()
+            finally:
+                await run_sync(self._close)
+
+        await run_sync(self._finish)
+        return str(self.path)
+
+
+async def download(
+    client: pyrogram.Client,
+    message: pyrogram.types.Message,
+    path: Union[str, Path],
+    *,
+    workers: int = 1,
+    progress: Optional[Progress] = None,
+    progress_args: Tuple[Any, ...] = (),
+) -> str:
+    """Downloads the media of a message to ``path``, resuming earlier attempts.
+
+    Downloads of the same file to the same path run one after the other.
+    """
+
+    download = ResumableDownload(client, message, path, workers=workers)
+    key = str(download.part_path.absolute())
+    lock = _download_locks.get(key)
+    if lock is None:
+        lock = _download_locks[key] = asyncio.Lock()
+
+    async with lock:
+        return await download.run(progress=progress, progress_args=progress_args)
+
+
+async def _parts(
+    chunks: AsyncIterable[bytes],
+) -> AsyncIterator[Tuple[bytes, bool]]:
+    """Regroups chunks into upload parts, telling whether each is the last one."""
+
+    buffer = bytearray()
+    pending = None
+    async for chunk in chunks:
+        buffer += chunk
+        while len(buffer) >= PART_SIZE:
+            # Hold a part back until we know whether more data follows
+            if pending is not None:
+                yield pending, False
+
+            pending = bytes(buffer[:PART_SIZE])
+            del buffer[:PART_SIZE]
+
+    if buffer:
+        if pending is not None:
+            yield pending, False
+
+        pending = bytes(buffer)
+
+    if pending is not None:
+        yield pending, True
+
+
+async def upload_stream(
+    client: pyrogram.Client,
+    chunks: AsyncIterable[bytes],
+    file_name: str,
+    *,
+    size: Optional[int] = None,
+    progress: Optional[Progress] = None,
+    progress_args: Tuple[Any, ...] = (),
+) -> Union[raw.types.InputFile, raw.types.InputFileBig]:
+    """Uploads a stream of bytes as a file without storing it anywhere.
+
+    Unless ``size`` is given, up to :data:`BIG_FILE_SIZE` bytes are buffered to
+    tell small files from big ones. Big files of unknown size are sent as a
+    streamed upload, where the total number of parts is only given with the last
+    part. Progress is reported with a total of 0 while the size isn't known.
+    """
+
+    parts = _parts(chunks)
+    buffered: List[Tuple[bytes, bool]] = []
+    if size is None:
+        buffered_size = 0
+        async for part, last in parts:
+            buffered.append((part, last))
+            buffered_size += len(part)
+            if buffered_size > BIG_FILE_SIZE:
+                break
+
+        if buffered and buffered[-1][1]:
+            size = buffered_size
+
+    if size == 0 or (size is None and not buffered):
+        raise ValueError("Nothing to upload")
+
+    is_big = size is None or size > BIG_FILE_SIZE
+    total_parts = math.ceil(size / PART_SIZE) if size is not None else -1
+    file_id = client.rnd_id()
+    md5_sum = md5() if not is_big else None
+
+    async def all_parts() -> AsyncIterator[Tuple[bytes, bool]]:
+        for item in buffered:
+            yield item
+
+        async for item in parts:
+            yield item
+
+    queue: "asyncio.Queue[Optional[raw.core.TLObject]]" = asyncio.Queue(UPLOAD_WORKERS)
+    errors: List[BaseException] = []
+
+    async def worker(session: Session) -> None:
+        while True:
+            rpc = await queue.get()
+            if rpc is None:
+                return
+
+            # Keep draining the queue after a failure so the producer never blocks
+            if errors:
+                continue
+
+            try:
+                if not await session.invoke(rpc):
+                    raise ConnectionError(f"Telegram refused a part of {file_name}")
+            except Exception as e:  # skipcq: PYL-W0703
+                errors.append(e)
+
+    async with client.save_file_semaphore:
+        session = Session(
+            client,
+            await client.storage.dc_id(),
+            await client.storage.auth_key(),
+            await client.storage.test_mode(),
+            is_media=True,
+        )
+        await session.start()
+
+        workers = [
+            asyncio.create_task(worker(session))
+            for _ in range(UPLOAD_WORKERS if is_big else 1)
+        ]
+        try:
+            current = 0
+            file_part = 0
+            async for part, last in all_parts():
+                if is_big:
+                    rpc = raw.functions.upload.SaveBigFilePart(
+                        file_id=file_id,
+                        file_part=file_part,
+                        file_total_parts=(
+                            file_part + 1 if last and total_parts < 0 else total_parts
+                        ),
+                        bytes=part,
+                    )
+                else:
+                    md5_sum.update(part)  # type: ignore
+                    rpc = raw.functions.upload.SaveFilePart(
+                        file_id=file_id, file_part=file_part, bytes=part
+                    )
+
+                await queue.put(rpc)
+                if errors:
+                    raise errors[0]
+
+                file_part += 1
+                current += len(part)
+                if progress is not None:
+                    await progress(current, size or 0, *progress_args)
+        finally:
+            for _ in workers:
+                await queue.put(None)
+
+            await asyncio.gather(*workers)
+            await session.stop()
+
+        if errors:
+            raise errors[0]
+
+    if size is None and progress is not None:
+        # Report the last state now that the size is known
+        await progress(current, current, *progress_args)
+
+    if is_big:
+        return raw.types.InputFileBig(id=file_id, parts=file_part, name=file_name)
+
+    return raw.types.InputFile(
+        id=file_id,
+        parts=file_part,
+        name=file_name,
+        md5_checksum=md5_sum.hexdigest(),  # type: ignore
+    )
+
+
+async def send_stream(
+    client: pyrogram.Client,
+    chat_id: Union[int, str],
+    chunks: AsyncIterable[bytes],
+    file_name: str,
+    *,
+    size: Optional[int] = None,
+    message_thread_id: Optional[int] = None,
+    progress: Optional[Progress] = None,
+    progress_args: Tuple[Any, ...] = (),
+) -> None:
+    """Sends a stream of bytes as a document, see :func:`upload_stream`."""
+
+    file = await upload_stream(
+        client,
+        chunks,
+        file_name,
+        size=size,
+        progress=progress,
+        progress_args=progress_args,
+    )
+    media = raw.types.InputMediaUploadedDocument(
+        file=file,
+        mime_type=client.guess_mime_type(file_name) or "application/octet-stream",
+        force_file=True,
+        attributes=[raw.types.DocumentAttributeFilename(file_name=file_name)],
+    )
+    await client.invoke(
+        raw.functions.messages.SendMedia(
+            peer=await client.resolve_peer(chat_id),
+            media=media,
+            message="",
+            random_id=client.rnd_id(),
+            reply_to=await utils.get_reply_to(
+                client=client, chat_id=chat_id, message_thread_id=message_thread_id
+            ),
+        )
+    )
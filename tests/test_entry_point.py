@@ -0,0 +1,69 @@
+import io
+import os
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+import pytest
+
+# The driver imports the bot itself
+pytest.importorskip("aiorun")
+Image = pytest.importorskip("PIL.Image")
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Runs main.py as the __main__ script, with caligo.main.main swapped for a
+# resize through the sticker image pool. Forkserver workers import main.py
+# again as __mp_main__, where the swap doesn't apply, so an unguarded entry
+# point would run the real main() in every worker.
+DRIVER = textwrap.dedent(
+    """
+    import asyncio
+    import io
+    import runpy
+    import sys
+
+    from PIL import Image
+
+    import caligo.main
+    from caligo.modules.stickers import ImageWorker
+
+
+    async def resize():
+        image = io.BytesIO()
+        Image.new("RGB", (1024, 256)).save(image, "PNG")
+
+        worker = ImageWorker(2, 0)
+        try:
+            data = await worker.resize(image.getvalue())
+        finally:
+            worker.close()
+
+        sys.stdout.buffer.write(data)
+
+
+    caligo.main.main = lambda: asyncio.run(resize())
+    runpy.run_path(sys.argv[1], run_name="__main__")
+    """
+)
+
+
+def test_image_pool_does_not_rerun_entry_point(tmp_path):
+    # No config.toml here, so a stray main() only logs that it's missing
+    (tmp_path / "caligo").mkdir()
+    env = dict(os.environ, PYTHONPATH=str(ROOT))
+
+    result = subprocess.run(
+        [sys.executable, "-c", DRIVER, str(ROOT / "main.py")],
+        cwd=tmp_path,
+        env=env,
+        capture_output=True,
+        timeout=60,
+        check=True,
+    )
+
+    with Image.open(io.BytesIO(result.stdout)) as image:
+        assert image.size == (512, 128)
+
+    assert b"config.toml' is missing" not in result.stderr